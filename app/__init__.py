@@ -14,20 +14,34 @@ def create_app():
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret")
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///budget.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQL_QUERY_HEADER"] = os.getenv("SQL_QUERY_HEADER", "0") == "1"
+    app.config["METRICS_ENABLED"] = os.getenv("METRICS_ENABLED", "0") == "1"
+    app.config["METRICS_DIR"] = os.getenv("METRICS_DIR") or None
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN") or None
+    app.config["SLOW_REQUEST_MS"] = float(os.getenv("SLOW_REQUEST_MS", "500"))
 
     db.init_app(app)
     login_manager.init_app(app)
+    from . import instrumentation
+    instrumentation.init_app(app)
 
-    from .models import User, Category, Transaction, Budget, Report  # noqa
+    from .models import User, Category, CategoryClosure, Transaction, Budget, Report, MonthlyRollup, ImportJob, SchemaVersion, Tag, TransactionTag, Forecast  # noqa
+    from . import rollups, dedup, forecast, migrations, report_cache, report_render
 
-    with app.app_context():
-        db.create_all()
-        ensure_seed_data()
+    # Schema and seed data are set up by `flask db upgrade` / `flask db seed`, not per worker.
+    app.cli.add_command(migrations.cli)
+    app.cli.add_command(rollups.cli)
+    app.cli.add_command(dedup.cli)
+    report_cache.cli.add_command(report_render.render_zip_command)
+    app.cli.add_command(report_cache.cli)
+    app.cli.add_command(forecast.cli)
 
     from .blueprints.auth import bp as auth_bp
     from .blueprints.core import bp as core_bp
+    from .blueprints.api import bp as api_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(core_bp)
+    app.register_blueprint(api_bp)
     return app
 
 def ensure_seed_data():
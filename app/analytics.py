@@ -0,0 +1,218 @@
+"""SQL-side aggregation for the analytics views.
+
+Grouping (by month, category, day and income vs. expense) runs in the database
+as GROUP BY over joins on Category, using only `extract` so the same queries
+work on SQLite and MySQL. Totals come back as exact Decimals and callers never
+see per-transaction ORM objects.
+"""
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import extract, func
+from .models import db, Category, CategoryClosure, Tag, Transaction, TransactionTag, Budget, MonthlyRollup
+from . import category_cache
+from .instrumentation import timed
+
+ZERO = Decimal("0")
+
+def _dec(v): return Decimal(str(v)).quantize(Decimal("0.01")) if v is not None else ZERO
+
+def month_bounds(period):
+    """'YYYY-MM' -> (first day, first day of next month)."""
+    y, m = map(int, period.split("-"))
+    return date(y, m, 1), date(y + (m==12), (m % 12)+1, 1)
+
+def period_months(period):
+    """'YYYY-MM', 'YYYY-Qn' or 'YYYY' -> the YYYY-MM periods it covers (ValueError if malformed)."""
+    y, sep, rest = period.partition("-")
+    if len(y) != 4 or not y.isdigit(): raise ValueError(period)
+    if not sep: months = [f"{y}-{m:02d}" for m in range(1, 13)]
+    elif len(rest) == 2 and rest[0] == "Q" and rest[1] in "1234":
+        q = int(rest[1])
+        months = [f"{y}-{m:02d}" for m in range(3*q-2, 3*q+1)]
+    elif len(rest) == 2 and rest.isdigit(): months = [period]
+    else: raise ValueError(period)
+    month_bounds(months[0]); month_bounds(months[-1])  # real dates only (no year 0000, no month 13)
+    return months
+
+def is_month(period):
+    """True for a valid 'YYYY-MM' month (the only form budgets and rollups use)."""
+    try: return period_months(period) == [period]
+    except ValueError: return False
+
+def period_bounds(period):
+    """(first day, day after the last) for any report period."""
+    months = period_months(period)
+    return month_bounds(months[0])[0], month_bounds(months[-1])[1]
+
+def containing_periods(month):
+    """The quarter and year report periods a YYYY-MM month rolls up into."""
+    y, m = month.split("-")
+    return [f"{y}-Q{(int(m)-1)//3+1}", y]
+
+def named(totals):
+    """{category_id: amount} -> [(name, amount)] merged by name, largest first."""
+    out = {}
+    for cid, v in totals.items():
+        name = category_cache.name(cid)
+        out[name] = out.get(name, ZERO) + v
+    return sorted(out.items(), key=lambda kv: kv[1], reverse=True)
+
+# --- rollup-backed (cost ~ months x categories) ---
+
+@timed("analytics.type_totals")
+def type_totals(user_id):
+    """{'income': Decimal, 'expense': Decimal} over the user's whole history."""
+    q = db.session.query(MonthlyRollup.type, func.sum(MonthlyRollup.total))\
+        .filter(MonthlyRollup.user_id==user_id, MonthlyRollup.count>0).group_by(MonthlyRollup.type)
+    return {ctype: _dec(v) for ctype, v in q}
+
+@timed("analytics.monthly_type_totals")
+def monthly_type_totals(user_id):
+    """{type: {period: Decimal}} from the rollup table."""
+    out = {}
+    q = db.session.query(MonthlyRollup.period, MonthlyRollup.type, func.sum(MonthlyRollup.total))\
+        .filter(MonthlyRollup.user_id==user_id, MonthlyRollup.count>0).group_by(MonthlyRollup.period, MonthlyRollup.type)
+    for period, ctype, v in q:
+        out.setdefault(ctype, {})[period] = _dec(v)
+    return out
+
+@timed("analytics.category_totals")
+def category_totals(user_id, period=None, ctype="expense"):
+    """{category_id: Decimal} for one type, optionally limited to a YYYY-MM period."""
+    q = db.session.query(MonthlyRollup.category_id, func.sum(MonthlyRollup.total))\
+        .filter(MonthlyRollup.user_id==user_id, MonthlyRollup.type==ctype, MonthlyRollup.count>0)
+    if period: q = q.filter(MonthlyRollup.period==period)
+    return {cid: _dec(v) for cid, v in q.group_by(MonthlyRollup.category_id)}
+
+@timed("analytics.subtree_totals")
+def subtree_totals(user_id, period=None, ctype="expense"):
+    """{category_id: Decimal} where each category's total includes every category below it."""
+    q = db.session.query(CategoryClosure.ancestor_id, func.sum(MonthlyRollup.total))\
+        .join(MonthlyRollup, MonthlyRollup.category_id==CategoryClosure.descendant_id)\
+        .filter(MonthlyRollup.user_id==user_id, MonthlyRollup.type==ctype, MonthlyRollup.count>0)
+    if period: q = q.filter(MonthlyRollup.period==period)
+    return {cid: _dec(v) for cid, v in q.group_by(CategoryClosure.ancestor_id)}
+
+def groups(subtotals):
+    """[(name, Decimal)] for categories that have children, from subtree totals, largest first."""
+    parents = {c.parent_id for c in category_cache.all() if c.parent_id}
+    return named({cid: v for cid, v in subtotals.items() if cid in parents and v})
+
+def tree_nodes(subtotals):
+    """Flat {id, parent, category, amount} nodes (amount = subtree total) for a sunburst/treemap."""
+    nodes = []
+    for cid, v in subtotals.items():
+        c = category_cache.get(cid)
+        if not c or not v: continue
+        parent = c.parent_id if c.parent_id in subtotals else ""
+        nodes.append({"id": cid, "parent": parent, "category": c.name, "amount": float(v)})
+    return sorted(nodes, key=lambda n: n["amount"], reverse=True)
+
+# --- transaction-backed (cost ~ rows in the requested range, grouped in SQL) ---
+
+def _live(user_id):
+    return db.session.query().select_from(Transaction).join(Category, Transaction.category_id==Category.id)\
+        .filter(Transaction.user_id==user_id, Transaction.is_deleted==False)
+
+def monthly_category_totals(user_id=None):
+    """(user_id, 'YYYY-MM', category_id, type, Decimal total, count) straight from transactions."""
+    y, m = extract("year", Transaction.date).label("y"), extract("month", Transaction.date).label("m")
+    q = db.session.query(Transaction.user_id, y, m, Transaction.category_id, Category.type,
+                         func.sum(Transaction.amount), func.count(Transaction.id))\
+        .join(Category, Transaction.category_id==Category.id).filter(Transaction.is_deleted==False)
+    if user_id is not None: q = q.filter(Transaction.user_id==user_id)
+    q = q.group_by(Transaction.user_id, y, m, Transaction.category_id, Category.type)
+    for uid, yy, mm, cid, ctype, total, cnt in q:
+        yield uid, f"{int(yy):04d}-{int(mm):02d}", cid, ctype, _dec(total), cnt
+
+def range_category_totals(user_id, start, end):
+    """{(category_id, type): Decimal} for start <= date < end."""
+    q = _live(user_id).filter(Transaction.date>=start, Transaction.date<end)\
+        .with_entities(Transaction.category_id, Category.type, func.sum(Transaction.amount))\
+        .group_by(Transaction.category_id, Category.type)
+    return {(cid, ctype): _dec(v) for cid, ctype, v in q}
+
+@timed("analytics.daily_cumulative")
+def daily_cumulative(user_id, start, end, ctype="expense"):
+    """[(day_of_month, running Decimal total)] for days with activity in [start, end)."""
+    day = extract("day", Transaction.date).label("d")
+    q = _live(user_id).filter(Category.type==ctype, Transaction.date>=start, Transaction.date<end)\
+        .with_entities(day, func.sum(Transaction.amount)).group_by(day).order_by(day)
+    out, cum = [], ZERO
+    for d, v in q:
+        cum += _dec(v); out.append((int(d), cum))
+    return out
+
+@timed("analytics.transaction_rows")
+def transaction_rows(user_id, start, end):
+    """Plain (date, amount, type, category, description) tuples for a date range."""
+    return _live(user_id).filter(Transaction.date>=start, Transaction.date<end)\
+        .with_entities(Transaction.date, Transaction.amount, Category.type, Category.name, Transaction.description)\
+        .order_by(Transaction.id).all()
+
+@timed("analytics.tag_totals")
+def tag_totals(user_id, start=None, end=None, ctype="expense"):
+    """[(tag, Decimal)] for start <= date < end, largest first; walks transaction_tag by tag, not the user's rows."""
+    q = db.session.query(Tag.name, func.sum(Transaction.amount))\
+        .join(TransactionTag, TransactionTag.tag_id==Tag.id)\
+        .join(Transaction, Transaction.id==TransactionTag.transaction_id)\
+        .join(Category, Transaction.category_id==Category.id)\
+        .filter(Tag.user_id==user_id, Transaction.is_deleted==False, Category.type==ctype)
+    if start: q = q.filter(Transaction.date>=start)
+    if end: q = q.filter(Transaction.date<end)
+    return sorted(((name, _dec(v)) for name, v in q.group_by(Tag.name)), key=lambda kv: kv[1], reverse=True)
+
+@timed("analytics.budgets")
+def budgets(user_id, period):
+    """[(category_id, Decimal target)] for a YYYY-MM period."""
+    q = db.session.query(Budget.category_id, Budget.target_amount).filter_by(user_id=user_id, period=period)
+    return [(cid, _dec(v)) for cid, v in q]
+
+# --- view-level summaries ---
+
+@timed("analytics.month_summary")
+def month_summary(user_id, period):
+    """The Report summary for one YYYY-MM period."""
+    start, end = month_bounds(period)
+    totals = range_category_totals(user_id, start, end)
+    income = sum((v for (_, t), v in totals.items() if t=="income"), ZERO)
+    expense = sum((v for (_, t), v in totals.items() if t=="expense"), ZERO)
+    by_cat = dict(named({cid: v for (cid, t), v in totals.items() if t=="expense"}))
+    top3 = {k: float(v) for k, v in list(by_cat.items())[:3]}
+    subtotals = subtree_totals(user_id, period)
+    variance = []
+    for cid, target in budgets(user_id, period):  # a budget on a parent covers its children
+        cat = category_cache.name(cid)
+        spent = subtotals.get(cid, ZERO)
+        variance.append({"category": cat, "spent": float(spent), "budget": float(target), "delta": float(spent - target)})
+    return {"income": float(income), "expense": float(expense), "balance": float(income - expense),
+            "top3": top3, "variance": variance, "by_category": {k: float(v) for k, v in by_cat.items()},
+            "by_group": {k: float(v) for k, v in groups(subtotals)},
+            "by_tag": {k: float(v) for k, v in tag_totals(user_id, start, end)}}
+
+@timed("analytics.combine_summaries")
+def combine_summaries(months):
+    """Roll {YYYY-MM: month summary} up into one quarter/year summary without rescanning rows."""
+    D = lambda v: Decimal(str(v))
+    income = sum((D(s["income"]) for s in months.values()), ZERO)
+    expense = sum((D(s["expense"]) for s in months.values()), ZERO)
+    by_cat, by_group, by_tag, var = {}, {}, {}, {}
+    for s in months.values():
+        for k, v in s.get("by_category", {}).items():
+            by_cat[k] = by_cat.get(k, ZERO) + D(v)
+        for k, v in s.get("by_group", {}).items():
+            by_group[k] = by_group.get(k, ZERO) + D(v)
+        for k, v in s.get("by_tag", {}).items():
+            by_tag[k] = by_tag.get(k, ZERO) + D(v)
+        for v in s.get("variance", []):
+            spent, budget = var.get(v["category"], (ZERO, ZERO))
+            var[v["category"]] = (spent + D(v["spent"]), budget + D(v["budget"]))
+    by_cat = dict(sorted(by_cat.items(), key=lambda kv: kv[1], reverse=True))
+    return {"income": float(income), "expense": float(expense), "balance": float(income - expense),
+            "top3": {k: float(v) for k, v in list(by_cat.items())[:3]},
+            "variance": [{"category": k, "spent": float(sp), "budget": float(b), "delta": float(sp - b)} for k, (sp, b) in var.items()],
+            "by_category": {k: float(v) for k, v in by_cat.items()},
+            "by_group": {k: float(v) for k, v in sorted(by_group.items(), key=lambda kv: kv[1], reverse=True)},
+            "by_tag": {k: float(v) for k, v in sorted(by_tag.items(), key=lambda kv: kv[1], reverse=True)},
+            "months": [{"period": p, "income": s["income"], "expense": s["expense"], "balance": s["balance"]}
+                       for p, s in sorted(months.items())]}
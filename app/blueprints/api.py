@@ -0,0 +1,47 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from .. import filters, category_cache, sync
+
+bp = Blueprint("api", __name__, url_prefix="/api")
+
+def txn_dict(t):
+    c = category_cache.get(t.category_id)
+    return {"id": t.id, "date": t.date.isoformat(), "amount": float(t.amount), "description": t.description or "",
+            "tags": t.tags or "", "category_id": t.category_id, "category": c.name if c else None,
+            "type": c.type if c else None}
+
+@bp.route("/transactions")
+@login_required
+def transactions():
+    f = filters.parse(request.args)
+    txns, next_cursor = filters.page(current_user.id, f, request.args.get("cursor"), request.args.get("limit", type=int))
+    return jsonify({"items": [txn_dict(t) for t in txns], "next_cursor": next_cursor})
+
+def change_dict(t):
+    if t.is_deleted:
+        d = {"id": t.id, "deleted": True}
+    else:
+        d = dict(txn_dict(t), deleted=False)
+    d.update(version=t.version, updated_at=t.updated_at.isoformat() if t.updated_at else None)
+    return d
+
+@bp.route("/transactions/batch", methods=["POST"])
+@login_required
+def transactions_batch():
+    body = request.get_json(silent=True)
+    items = body.get("items") if isinstance(body, dict) else None
+    if not isinstance(items, list):
+        return jsonify({"error": "expected a JSON object with an 'items' list"}), 400
+    if len(items) > sync.MAX_BATCH:
+        return jsonify({"error": f"at most {sync.MAX_BATCH} items per batch"}), 413
+    results, committed = sync.apply_batch(current_user.id, items, atomic=bool(body.get("atomic")))
+    return jsonify({"results": results, "committed": committed}), 200 if committed else 409
+
+@bp.route("/transactions/changes")
+@login_required
+def transactions_changes():
+    after = sync.decode_cursor(request.args.get("since"))
+    if after is None:
+        return jsonify({"error": "invalid since cursor"}), 400
+    txns, cursor, more = sync.changes(current_user.id, after, request.args.get("limit", type=int))
+    return jsonify({"items": [change_dict(t) for t in txns], "cursor": cursor, "has_more": more})
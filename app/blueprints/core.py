@@ -1,40 +1,36 @@
-import io, csv, json, calendar
+import io, calendar
 from datetime import date, datetime
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify
+from decimal import Decimal
+from flask import Blueprint, Response, abort, current_app, render_template, request, redirect, url_for, flash, send_file, jsonify, stream_with_context
 from flask_login import login_required, current_user
-from sqlalchemy import extract
-import pandas as pd
-from ..models import db, Category, Transaction, Budget, Report
+from ..models import db, Category, Transaction, Budget, ImportJob, MonthlyRollup
+from .. import analytics, dedup, exporter, filters, forecast, rollups, tag_index, category_cache, category_tree, report_cache, report_render, versions
 
 bp = Blueprint("core", __name__)
 
 @bp.route("/")
 @login_required
+@versions.conditional(daily=True)
 def dashboard():
-    txns = Transaction.query.filter_by(user_id=current_user.id, is_deleted=False).all()
-    df = pd.DataFrame([{
-        "date": t.date, "amount": float(t.amount), "type": Category.query.get(t.category_id).type,
-        "category": Category.query.get(t.category_id).name
-    } for t in txns]) if txns else pd.DataFrame(columns=["date","amount","type","category"])
-
-    total_income = float(df[df["type"]=="income"]["amount"].sum()) if not df.empty else 0.0
-    total_expense = float(df[df["type"]=="expense"]["amount"].sum()) if not df.empty else 0.0
+    totals = analytics.type_totals(current_user.id)
+    total_income = float(totals.get("income", 0))
+    total_expense = float(totals.get("expense", 0))
     balance = total_income - total_expense
 
     # Alerts vs budget (current month)
     today = date.today()
     period = today.strftime("%Y-%m")
     alerts = []
-    if not df.empty:
-        df["date"] = pd.to_datetime(df["date"])
-        month_df = df[(df["date"].dt.strftime("%Y-%m")==period) & (df["type"]=="expense")]
-        spent_by_cat = month_df.groupby("category")["amount"].sum().to_dict()
-        budgets = Budget.query.filter_by(user_id=current_user.id, period=period).all()
-        for b in budgets:
-            cat = Category.query.get(b.category_id).name
-            spent = spent_by_cat.get(cat, 0.0)
-            if float(b.target_amount) > 0 and spent >= 0.9*float(b.target_amount):
-                alerts.append({"category": cat, "spent": round(spent,2), "budget": float(b.target_amount)})
+    if totals:
+        spent_by_cat = analytics.subtree_totals(current_user.id, period)  # parent budgets cover their children
+        budgets = analytics.budgets(current_user.id, period)
+        projected = {cid: p for cid, (_, _, p) in (forecast.current(current_user.id) or {}).items()} if budgets else {}
+        for cid, target in budgets:
+            spent = spent_by_cat.get(cid, 0)
+            proj = max(projected.get(cid, 0), spent)
+            if target > 0 and (spent >= Decimal("0.9")*target or proj > target):
+                alerts.append({"category": category_cache.name(cid), "spent": float(spent), "budget": float(target),
+                               "projected": float(proj)})
 
     return render_template("index.html",
                            total_income=round(total_income,2),
@@ -44,78 +40,102 @@ def dashboard():
 
 @bp.route("/data/summary.json")
 @login_required
+@versions.conditional(daily=True)
 def data_summary():
-    txns = Transaction.query.filter_by(user_id=current_user.id, is_deleted=False).all()
-    if not txns:
-        return jsonify({"timeseries": [], "categories": [], "income_ts": [], "expense_ts": [],
-                        "cm_categories": [], "daily_cum": [], "budget_total": 0, "spent_total": 0,
-                        "budget_progress": []})
-    rows = []
-    for t in txns:
-        cat = Category.query.get(t.category_id)
-        rows.append({"date": t.date.isoformat(), "amount": float(t.amount), "ctype": cat.type, "category": cat.name})
-    df = pd.DataFrame(rows)
-    df["date"] = pd.to_datetime(df["date"])
-    df["month"] = df["date"].dt.to_period("M").dt.to_timestamp()
+    body = versions.cached_json("summary", lambda: _summary_payload(current_user.id), daily=True)
+    return current_app.response_class(body, mimetype="application/json")
 
-    inc = df[df["ctype"]=="income"].groupby("month")["amount"].sum().reset_index()
-    exp = df[df["ctype"]=="expense"].groupby("month")["amount"].sum().reset_index()
-    net = pd.merge(inc, exp, on="month", how="outer", suffixes=("_inc","_exp")).fillna(0)
-    net["net"] = net["amount_inc"] - net["amount_exp"]
-    net = net.sort_values("month")
-
-    cat_split = df[df["ctype"]=="expense"].groupby("category")["amount"].sum().reset_index().sort_values("amount", ascending=False)
+def _summary_payload(user_id):
+    monthly = analytics.monthly_type_totals(user_id)
+    if not monthly:
+        return {"timeseries": [], "categories": [], "income_ts": [], "expense_ts": [],
+                "cm_categories": [], "daily_cum": [], "budget_total": 0, "spent_total": 0,
+                "budget_progress": [], "category_groups": [], "cm_category_tree": [], "cm_tags": [], "ytd_tags": []}
+    inc, exp = monthly.get("income", {}), monthly.get("expense", {})
+    months = sorted(set(inc) | set(exp))
+    cat_split = analytics.named(analytics.category_totals(user_id))
 
     today = date.today()
     period = today.strftime("%Y-%m")
-    cm = df[df["date"].dt.strftime("%Y-%m")==period]
-    cm_exp = cm[cm["ctype"]=="expense"]
-    cm_cat = cm_exp.groupby("category")["amount"].sum().reset_index().sort_values("amount", ascending=False)
+    cm_cat = analytics.named(analytics.category_totals(user_id, period))
+    cm_sub = analytics.subtree_totals(user_id, period)
 
-    if not cm_exp.empty:
-        cm_exp = cm_exp.copy()
-        cm_exp["day"] = cm_exp["date"].dt.day
-        daily = cm_exp.groupby("day")["amount"].sum().sort_index().cumsum().reset_index()
+    budgets = analytics.budgets(user_id, period)
+    budget_total = sum((t for _, t in budgets), Decimal("0"))
+    spent_total = sum((v for _, v in cm_cat), Decimal("0"))
+    daily_cum = []
+    if cm_cat:
+        start, end = analytics.month_bounds(period)
         days_in_month = calendar.monthrange(today.year, today.month)[1]
-        budgets = Budget.query.filter_by(user_id=current_user.id, period=period).all()
-        budget_total = float(sum([b.target_amount for b in budgets])) if budgets else 0.0
-        spent_total = float(cm_exp["amount"].sum())
-        daily["budget_line"] = [(budget_total/days_in_month)*int(d) for d in daily["day"]]
-        daily_cum = [{"day": int(r["day"]), "spent_cum": round(float(r["amount"]),2), "budget_line": round(float(r["budget_line"]),2)} for _, r in daily.iterrows()]
-    else:
-        daily_cum = []
-        budgets = Budget.query.filter_by(user_id=current_user.id, period=period).all()
-        budget_total = float(sum([b.target_amount for b in budgets])) if budgets else 0.0
-        spent_total = 0.0
+        daily_cum = [{"day": d, "spent_cum": float(cum), "budget_line": round(float(budget_total)/days_in_month*d,2)}
+                     for d, cum in analytics.daily_cumulative(user_id, start, end)]
 
     budget_progress = []
     if budgets:
-        by_cat = cm_exp.groupby("category")["amount"].sum().to_dict() if not cm_exp.empty else {}
-        for b in budgets:
-            cat_name = Category.query.get(b.category_id).name
-            spent = float(by_cat.get(cat_name, 0.0))
-            bud = float(b.target_amount)
-            pct = (spent / bud * 100.0) if bud > 0 else 0.0
-            budget_progress.append({"category": cat_name, "spent": round(spent,2), "budget": bud, "pct": round(pct,1)})
+        for cid, bud in budgets:
+            cat_name = category_cache.name(cid)
+            spent = cm_sub.get(cid, Decimal("0"))
+            pct = float(spent / bud * 100) if bud > 0 else 0.0
+            budget_progress.append({"category": cat_name, "spent": float(spent), "budget": float(bud), "pct": round(pct,1)})
         budget_progress.sort(key=lambda x: x["pct"], reverse=True)
 
-    return jsonify({
-        "timeseries": [{"month": m.strftime("%Y-%m"), "net": round(v,2)} for m, v in zip(net["month"], net["net"])],
-        "income_ts": [{"month": m.strftime("%Y-%m"), "income": round(v,2)} for m, v in zip(inc["month"], inc["amount"])],
-        "expense_ts": [{"month": m.strftime("%Y-%m"), "expense": round(v,2)} for m, v in zip(exp["month"], exp["amount"])],
-        "categories": [{"category": r["category"], "amount": round(r["amount"],2)} for _, r in cat_split.iterrows()],
-        "cm_categories": [{"category": r["category"], "amount": round(r["amount"],2)} for _, r in cm_cat.iterrows()],
+    return {
+        "timeseries": [{"month": m, "net": float(inc.get(m, 0) - exp.get(m, 0))} for m in months],
+        "income_ts": [{"month": m, "income": float(inc[m])} for m in months if m in inc],
+        "expense_ts": [{"month": m, "expense": float(exp[m])} for m in months if m in exp],
+        "categories": [{"category": k, "amount": float(v)} for k, v in cat_split],
+        "cm_categories": [{"category": k, "amount": float(v)} for k, v in cm_cat],
         "daily_cum": daily_cum,
-        "budget_total": round(budget_total,2),
-        "spent_total": round(spent_total,2),
-        "budget_progress": budget_progress
-    })
+        "budget_total": float(budget_total),
+        "spent_total": float(spent_total),
+        "budget_progress": budget_progress,
+        "category_groups": [{"category": k, "amount": float(v)} for k, v in analytics.groups(analytics.subtree_totals(user_id))],
+        "cm_category_tree": analytics.tree_nodes(cm_sub),
+        "cm_tags": [{"tag": k, "amount": float(v)} for k, v in analytics.tag_totals(user_id, *analytics.month_bounds(period))],
+        "ytd_tags": [{"tag": k, "amount": float(v)} for k, v in analytics.tag_totals(user_id, *analytics.period_bounds(str(today.year)))]
+    }
+
+@bp.route("/data/forecast.json")
+@login_required
+@versions.conditional(daily=True)
+def data_forecast():
+    body = versions.cached_json("forecast", lambda: _forecast_payload(current_user.id), daily=True)
+    return current_app.response_class(body, mimetype="application/json")
+
+def _forecast_payload(user_id):
+    today = date.today()
+    period = today.strftime("%Y-%m")
+    figures = forecast.current(user_id, today)
+    available = figures is not None
+    if not available:  # not forecast yet this month (see `flask forecast run`): live spend, no projection
+        figures = {cid: (s, Decimal("0"), s) for cid, s in analytics.subtree_totals(user_id, period).items()}
+    budgets = dict(analytics.budgets(user_id, period))
+    cats = []
+    for cid in set(figures) | set(budgets):
+        if category_cache.get(cid) is None: continue  # deleted since the forecast was stored
+        spent, due, proj = figures.get(cid, (Decimal("0"),) * 3)
+        bud = budgets.get(cid, Decimal("0"))
+        cats.append({"category": category_cache.name(cid), "spent": float(spent), "projected": float(proj),
+                     "recurring_due": float(due), "budget": float(bud),
+                     "pct_projected": round(float(proj / bud * 100), 1) if bud > 0 else None,
+                     "likely_over": bool(bud > 0 and proj > bud)})
+    cats.sort(key=lambda c: c["projected"], reverse=True)
+    roots = {c.id for c in category_cache.all() if not c.parent_id}
+    top = [v for cid, v in figures.items() if cid in roots]
+    return {"period": period, "day": today.day, "days_in_month": calendar.monthrange(today.year, today.month)[1],
+            "spent_total": float(sum((s for s, _, _ in top), Decimal("0"))),
+            "projected_total": float(sum((p for _, _, p in top), Decimal("0"))) if available else None,
+            "available": available, "categories": cats}
 
 @bp.route("/transactions")
 @login_required
 def transactions_list():
-    q = Transaction.query.filter_by(user_id=current_user.id, is_deleted=False).order_by(Transaction.date.desc(), Transaction.id.desc())
-    return render_template("transactions_list.html", txns=q.all(), categories=Category.query.all())
+    f = filters.parse(request.args)
+    txns, next_cursor = filters.page(current_user.id, f, request.args.get("cursor"), request.args.get("limit", type=int))
+    args = {k: request.args[k] for k in filters.ARGS + ("limit",) if request.args.get(k)}  # echoed into url_for
+    return render_template("transactions_list.html", txns=txns, next_cursor=next_cursor, filter_args=args,
+                           categories=category_cache.all(),
+                           category_map={cid: category_cache.get(cid) for cid in {t.category_id for t in txns}})
 
 @bp.route("/transactions/add", methods=["GET","POST"])
 @login_required
@@ -128,10 +148,10 @@ def transactions_add():
         tags = request.form.get("tags","")
         t = Transaction(user_id=current_user.id, category_id=category_id, date=d, amount=amount, description=desc, tags=tags)
         t.dup_hash = t.compute_dup_hash()
-        db.session.add(t); db.session.commit()
+        db.session.add(t); db.session.flush(); tag_index.set_for(t); rollups.track(t); db.session.commit()
         flash("Transaction added.", "success")
         return redirect(url_for("core.transactions_list"))
-    return render_template("transaction_form.html", categories=Category.query.all(), txn=None)
+    return render_template("transaction_form.html", categories=category_cache.all(), txn=None)
 
 @bp.route("/transactions/<int:txn_id>/edit", methods=["GET","POST"])
 @login_required
@@ -140,16 +160,19 @@ def transactions_edit(txn_id):
     if t.user_id != current_user.id:
         flash("Not allowed.", "danger"); return redirect(url_for("core.transactions_list"))
     if request.method == "POST":
+        if not t.is_deleted: rollups.track(t, -1)
         t.date = datetime.fromisoformat(request.form.get("date")).date()
         t.amount = float(request.form.get("amount","0"))
         t.category_id = int(request.form.get("category_id"))
         t.description = request.form.get("description","")
         t.tags = request.form.get("tags","")
         t.dup_hash = t.compute_dup_hash()
+        tag_index.set_for(t)
+        if not t.is_deleted: rollups.track(t)
         db.session.commit()
         flash("Transaction updated.", "success")
         return redirect(url_for("core.transactions_list"))
-    return render_template("transaction_form.html", categories=Category.query.all(), txn=t)
+    return render_template("transaction_form.html", categories=category_cache.all(), txn=t)
 
 @bp.route("/transactions/<int:txn_id>/delete")
 @login_required
@@ -157,6 +180,7 @@ def transactions_delete(txn_id):
     t = Transaction.query.get_or_404(txn_id)
     if t.user_id != current_user.id:
         flash("Not allowed.", "danger"); return redirect(url_for("core.transactions_list"))
+    if not t.is_deleted: rollups.track(t, -1)
     t.is_deleted = True; db.session.commit()
     flash("Transaction deleted (soft).", "info")
     return redirect(url_for("core.transactions_list"))
@@ -164,58 +188,100 @@ def transactions_delete(txn_id):
 @bp.route("/transactions/import", methods=["POST"])
 @login_required
 def transactions_import():
+    from .. import importer  # pulls in pandas; only import requests should pay for it
     f = request.files.get("csvfile")
     if not f:
         flash("No file uploaded.", "warning"); return redirect(url_for("core.transactions_list"))
-    df = pd.read_csv(f)
-    df.columns = [c.lower() for c in df.columns]
-    required = {"date","description","amount","type","category"}
-    if not required.issubset(set(df.columns)):
-        flash("CSV must include columns: date, description, amount, type, category.", "danger")
+    policy = request.form.get("on_duplicate", "skip")
+    if policy not in dedup.POLICIES:
+        flash("Unknown duplicate policy.", "danger"); return redirect(url_for("core.transactions_list"))
+    if request.form.get("background"):
+        job = importer.start_job(current_app._get_current_object(), f, current_user.id, policy)
+        flash(f"Import started in the background (job {job.id}); status at {url_for('core.transactions_import_status', job_id=job.id)}", "info")
         return redirect(url_for("core.transactions_list"))
-    cats = { (c.name.lower(), c.type): c for c in Category.query.all() }
-    for _, row in df.iterrows():
-        cname = str(row["category"]).strip()
-        ctype = str(row["type"]).strip().lower()
-        if (cname.lower(), ctype) not in cats:
-            c = Category(name=cname, type=ctype); db.session.add(c); db.session.flush()
-            cats[(cname.lower(), ctype)] = c
-        d = pd.to_datetime(row["date"]).date()
-        amount = float(row["amount"]); desc = str(row.get("description",""))
-        cat_id = cats[(cname.lower(), ctype)].id
-        t = Transaction(user_id=current_user.id, category_id=cat_id, date=d, amount=amount, description=desc)
-        t.dup_hash = t.compute_dup_hash(); db.session.add(t)
-    db.session.commit(); flash("CSV imported.", "success")
+    try:
+        stats = importer.import_csv(f.stream, current_user.id, policy=policy)
+    except importer.ImportFormatError as e:
+        flash(str(e), "danger"); return redirect(url_for("core.transactions_list"))
+    msg = f"CSV imported ({stats['rows']} rows"
+    if stats["duplicates"]:
+        msg += {"skip": ", {} duplicates skipped", "flag": ", {} duplicates tagged 'duplicate'",
+                "overwrite": ", {} duplicates replaced"}[policy].format(stats["duplicates"])
+    flash(msg + ").", "success")
     return redirect(url_for("core.transactions_list"))
 
+@bp.route("/transactions/import/<int:job_id>")
+@login_required
+def transactions_import_status(job_id):
+    job = ImportJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        return jsonify({"error": "not found"}), 404
+    from .. import importer
+    importer.reap([job]); db.session.commit()
+    return jsonify(job.to_dict())
+
+def _export_response(chunks, mimetype, filename):
+    if request.args.get("gzip") in ("1", "true"):
+        chunks, mimetype, filename = exporter.gzipped(chunks), "application/gzip", filename + ".gz"
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
 @bp.route("/transactions/export.csv")
 @login_required
+@versions.conditional()
 def transactions_export_csv():
-    txns = Transaction.query.filter_by(user_id=current_user.id, is_deleted=False).all()
-    out = io.StringIO(); writer = csv.writer(out)
-    writer.writerow(["date","description","amount","category","type","tags"])
-    for t in txns:
-        c = Category.query.get(t.category_id)
-        writer.writerow([t.date.isoformat(), t.description, float(t.amount), c.name, c.type, t.tags or ""])
-    mem = io.BytesIO(out.getvalue().encode())
-    return send_file(mem, mimetype="text/csv", as_attachment=True, download_name="transactions.csv")
+    f = filters.parse(request.args)
+    return _export_response(exporter.csv_chunks(current_user.id, f), "text/csv", "transactions.csv")
+
+@bp.route("/transactions/export.ndjson")
+@login_required
+@versions.conditional()
+def transactions_export_ndjson():
+    f = filters.parse(request.args)
+    return _export_response(exporter.ndjson_chunks(current_user.id, f), "application/x-ndjson", "transactions.ndjson")
 
 @bp.route("/categories", methods=["GET","POST"])
 @login_required
 def categories():
     if request.method == "POST":
         name = request.form.get("name","").strip(); ctype = request.form.get("type","expense")
+        parent = db.session.get(Category, request.form.get("parent_id", type=int) or 0)
         if not name: flash("Name required.", "warning")
+        elif parent and parent.type != ctype: flash("A sub-category must have the same type as its parent.", "warning")
         else:
-            db.session.add(Category(name=name, type=ctype)); db.session.commit()
+            db.session.add(Category(name=name, type=ctype, parent_id=parent.id if parent else None))
+            if parent: report_cache.invalidate_all()  # the parent's group totals change
+            versions.bump_all(); db.session.commit(); category_cache.invalidate()
             flash("Category added.", "success")
         return redirect(url_for("core.categories"))
-    return render_template("categories.html", categories=Category.query.order_by(Category.type, Category.name).all())
+    cats = category_cache.all(); by_id = {c.id: c for c in cats}
+    rows = sorted(((category_tree.label(c, by_id), c) for c in cats), key=lambda r: (r[1].type, r[0].lower()))
+    return render_template("categories.html", categories=rows)
+
+@bp.route("/categories/<int:cid>/parent", methods=["POST"])
+@login_required
+def categories_move(cid):
+    c = Category.query.get_or_404(cid)
+    parent = db.session.get(Category, request.form.get("parent_id", type=int) or 0)
+    if parent and parent.type != c.type:
+        flash("A sub-category must have the same type as its parent.", "warning"); return redirect(url_for("core.categories"))
+    try: category_tree.move(c, parent.id if parent else None)
+    except ValueError as e:
+        db.session.rollback(); flash(str(e), "warning"); return redirect(url_for("core.categories"))
+    report_cache.invalidate_all(); versions.bump_all(); db.session.commit(); category_cache.invalidate()
+    flash("Category moved.", "success"); return redirect(url_for("core.categories"))
 
 @bp.route("/categories/<int:cid>/delete")
 @login_required
 def categories_delete(cid):
-    c = Category.query.get_or_404(cid); db.session.delete(c); db.session.commit()
+    c = Category.query.get_or_404(cid)
+    # Rows keep their category_id (and rollups their totals), so a category in use cannot go; the FK agrees on MySQL.
+    used = db.session.query(Transaction.id).filter_by(category_id=cid).count() + Budget.query.filter_by(category_id=cid).count()
+    if used:
+        flash(f"{c.name} is used by {used} transactions or budgets; move or delete them first.", "warning")
+        return redirect(url_for("core.categories"))
+    category_tree.delete(c); report_cache.invalidate_all(); versions.bump_all()
+    db.session.commit(); category_cache.invalidate()
     flash("Category deleted.", "info"); return redirect(url_for("core.categories"))
 
 @bp.route("/budgets", methods=["GET","POST"])
@@ -223,15 +289,20 @@ def categories_delete(cid):
 def budgets():
     if request.method == "POST":
         category_id = int(request.form.get("category_id"))
-        period = request.form.get("period")
+        period = (request.form.get("period") or "").strip()
+        if not analytics.is_month(period):
+            flash("Period must be a month in YYYY-MM form, e.g. 2025-11.", "warning"); return redirect(url_for("core.budgets"))
         target = float(request.form.get("target_amount","0"))
         b = Budget.query.filter_by(user_id=current_user.id, category_id=category_id, period=period).first()
         if not b: b = Budget(user_id=current_user.id, category_id=category_id, period=period, target_amount=target); db.session.add(b)
         else: b.target_amount = target
+        report_cache.invalidate(current_user.id, [period]); versions.bump(current_user.id)
         db.session.commit(); flash("Budget saved.", "success")
         return redirect(url_for("core.budgets"))
     items = db.session.query(Budget, Category).join(Category, Budget.category_id==Category.id).filter(Budget.user_id==current_user.id).all()
-    return render_template("budgets.html", categories=Category.query.filter_by(type="expense").all(), items=items)
+    cats = category_cache.all(); by_id = {c.id: c for c in cats}
+    options = sorted(((c.id, category_tree.label(c, by_id)) for c in cats if c.type=="expense"), key=lambda o: o[1].lower())
+    return render_template("budgets.html", categories=options, items=items, labels=dict(options))
 
 @bp.route("/budgets/<int:bid>/delete")
 @login_required
@@ -239,72 +310,38 @@ def budgets_delete(bid):
     b = Budget.query.get_or_404(bid)
     if b.user_id != current_user.id: 
         flash("Not allowed.", "danger"); return redirect(url_for("core.budgets"))
+    report_cache.invalidate(b.user_id, [b.period]); versions.bump(b.user_id)
     db.session.delete(b); db.session.commit(); flash("Budget deleted.", "info")
     return redirect(url_for("core.budgets"))
 
 @bp.route("/reports")
 @login_required
 def reports():
-    months = db.session.query(extract("year", Transaction.date).label("y"), extract("month", Transaction.date).label("m"))            .filter_by(user_id=current_user.id, is_deleted=False).distinct().order_by("y","m").all()
-    periods = [f"{int(y):04d}-{int(m):02d}" for y,m in months]
-    return render_template("reports.html", periods=periods)
+    months = [p for (p,) in db.session.query(MonthlyRollup.period).filter(MonthlyRollup.user_id==current_user.id, MonthlyRollup.count>0)
+              .distinct().order_by(MonthlyRollup.period)]
+    quarters = sorted({analytics.containing_periods(m)[0] for m in months})
+    years = sorted({analytics.containing_periods(m)[1] for m in months})
+    return render_template("reports.html", periods=months, quarters=quarters, years=years)
 
 @bp.route("/reports/<period>")
 @login_required
+@versions.conditional()
 def report_view(period):
-    y, m = map(int, period.split("-"))
-    start = date(y,m,1)
-    end = date(y + (m==12), (m % 12)+1, 1)
-    txns = Transaction.query.filter(Transaction.user_id==current_user.id, Transaction.is_deleted==False, Transaction.date>=start, Transaction.date<end).all()
+    try: months = analytics.period_months(period)
+    except ValueError: abort(404)
+    summary = report_cache.summary(current_user.id, period)
     rows = []
-    for t in txns:
-        c = Category.query.get(t.category_id)
-        rows.append({"date": t.date.isoformat(), "amount": float(t.amount), "type": c.type, "category": c.name, "desc": t.description})
-    df = pd.DataFrame(rows)
-    income = round(float(df[df["type"]=="income"]["amount"].sum()) if not df.empty else 0.0, 2)
-    expense = round(float(df[df["type"]=="expense"]["amount"].sum()) if not df.empty else 0.0, 2)
-    by_cat = df[df["type"]=="expense"].groupby("category")["amount"].sum().sort_values(ascending=False) if not df.empty else pd.Series(dtype=float)
-    top3 = by_cat.head(3).round(2).to_dict()
-    variance = []
-    budgets = Budget.query.filter_by(user_id=current_user.id, period=period).all()
-    for b in budgets:
-        cat = Category.query.get(b.category_id).name
-        spent = float(by_cat.get(cat, 0.0))
-        variance.append({"category": cat, "spent": round(spent,2), "budget": float(b.target_amount), "delta": round(spent-float(b.target_amount),2)})
-    summary = {"income": income, "expense": expense, "balance": round(income-expense,2), "top3": top3, "variance": variance}
-    rep = Report.query.filter_by(user_id=current_user.id, period=period).first()
-    if not rep: rep = Report(user_id=current_user.id, period=period, summary_json=json.dumps(summary)); db.session.add(rep)
-    else: rep.summary_json = json.dumps(summary)
-    db.session.commit()
+    if months == [period]:
+        start, end = analytics.month_bounds(period)
+        rows = [{"date": d.isoformat(), "amount": float(a), "type": ctype, "category": cname, "desc": desc}
+                for d, a, ctype, cname, desc in analytics.transaction_rows(current_user.id, start, end)]
     return render_template("report_view.html", period=period, summary=summary, rows=rows)
 
 @bp.route("/reports/<period>/export.pdf")
 @login_required
+@versions.conditional(extra=(report_render.RENDER_VERSION,))
 def report_pdf(period):
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.units import cm
-    rep = Report.query.filter_by(user_id=current_user.id, period=period).first()
-    if not rep:
-        flash("Generate the report first by viewing it.", "warning")
-        return redirect(url_for("core.reports"))
-    summary = json.loads(rep.summary_json)
-    buf = io.BytesIO(); c = canvas.Canvas(buf, pagesize=A4)
-    width, height = A4; y = height - 2*cm
-    c.setFont("Helvetica-Bold", 16); c.drawString(2*cm, y, f"Monthly Report - {period}"); y -= 1*cm
-    c.setFont("Helvetica", 12)
-    c.drawString(2*cm, y, f"Income: {summary['income']}"); y -= 0.6*cm
-    c.drawString(2*cm, y, f"Expense: {summary['expense']}"); y -= 0.6*cm
-    c.drawString(2*cm, y, f"Balance: {summary['balance']}"); y -= 1*cm
-    c.setFont("Helvetica-Bold", 12); c.drawString(2*cm, y, "Top 3 Expenses:"); y -= 0.6*cm
-    c.setFont("Helvetica", 12)
-    for k,v in summary.get("top3",{}).items():
-        c.drawString(2.5*cm, y, f"- {k}: {v}"); y -= 0.5*cm
-    y -= 0.4*cm
-    c.setFont("Helvetica-Bold", 12); c.drawString(2*cm, y, "Budget Variance:"); y -= 0.6*cm
-    c.setFont("Helvetica", 12)
-    for v in summary.get("variance", []):
-        c.drawString(2.5*cm, y, f"- {v['category']}: Spent {v['spent']} vs Budget {v['budget']} (Δ {v['delta']})"); y -= 0.5*cm
-        if y < 2*cm: c.showPage(); y = height - 2*cm
-    c.showPage(); c.save(); buf.seek(0)
-    return send_file(buf, as_attachment=True, download_name=f"report_{period}.pdf", mimetype="application/pdf")
+    try: analytics.period_months(period)
+    except ValueError: abort(404)
+    data = report_render.pdf_bytes(current_user.id, period)
+    return send_file(io.BytesIO(data), as_attachment=True, download_name=f"report_{period}.pdf", mimetype="application/pdf")
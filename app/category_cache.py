@@ -0,0 +1,59 @@
+"""Process-wide Category map (id -> name, type, parent_id).
+
+Categories are few and change rarely, while aggregation paths look one up per
+row. Views that create or delete categories call `invalidate()` after their
+commit; the TTL bounds how long other gunicorn workers can serve a stale map
+for existing categories. A lookup that misses reloads first (see `get`), so a
+category created by another worker is never reported as unknown.
+"""
+import threading, time
+from collections import namedtuple
+from flask import g, has_request_context
+from .models import Category
+
+CategoryInfo = namedtuple("CategoryInfo", "id name type parent_id")
+
+TTL_SECONDS = 60
+MISS_RELOAD_SECONDS = 1  # see _may_reload
+_lock = threading.Lock()
+_map = None
+_loaded_at = 0.0
+_max_id = 0
+
+def _load(force=False):
+    global _map, _loaded_at, _max_id
+    m = _map
+    if not force and m is not None and time.monotonic() - _loaded_at < TTL_SECONDS:
+        return m
+    with _lock:
+        if force or _map is None or time.monotonic() - _loaded_at >= TTL_SECONDS:
+            rows = Category.query.with_entities(Category.id, Category.name, Category.type, Category.parent_id).all()
+            _map = {r.id: CategoryInfo(r.id, r.name, r.type, r.parent_id) for r in rows}
+            _loaded_at, _max_id = time.monotonic(), max(_map, default=0)
+        return _map
+
+def _may_reload(cid):
+    """At most one forced reload per request; ids below the newest loaded one (deleted
+    categories), and lookups outside a request, also wait MISS_RELOAD_SECONDS."""
+    due = time.monotonic() - _loaded_at >= MISS_RELOAD_SECONDS
+    if not has_request_context(): return due
+    if g.get("category_map_reloaded") or not (cid > _max_id or due): return False
+    g.category_map_reloaded = True
+    return True
+
+def get(cid):
+    """The category, or None if it does not exist; a miss reloads the map before giving up."""
+    c = _load().get(cid)
+    if c is None and isinstance(cid, int) and _may_reload(cid):
+        c = _load(force=True).get(cid)
+    return c
+
+def name(cid):
+    c = get(cid)
+    return c.name if c else "(deleted)"
+
+def all(): return sorted(_load().values(), key=lambda c: c.id)
+
+def invalidate():
+    global _map
+    with _lock: _map = None
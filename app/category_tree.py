@@ -0,0 +1,78 @@
+"""Category hierarchy kept as a closure table.
+
+CategoryClosure holds a row for every (ancestor, descendant) pair, so the
+totals for a category and everything under it are one join from the rollup
+table on descendant_id grouped by ancestor_id (see analytics.subtree_totals).
+Rows for new categories are written by an ORM insert hook, so every path that
+creates one (the categories view, CSV import, seeding) stays in sync; `move`
+re-parents a subtree, `delete` removes a category and its rows, and `rebuild`
+recomputes the whole table.
+"""
+from sqlalchemy import event, select, update
+from .models import db, Category, CategoryClosure
+
+@event.listens_for(Category, "after_insert")
+def _add(mapper, conn, c):
+    """Closure rows for a new category: itself, plus each ancestor of its parent one level deeper."""
+    t = CategoryClosure.__table__
+    rows = [{"ancestor_id": c.id, "descendant_id": c.id, "depth": 0}]
+    if c.parent_id:
+        rows += [{"ancestor_id": a, "descendant_id": c.id, "depth": d + 1}
+                 for a, d in conn.execute(select(t.c.ancestor_id, t.c.depth).where(t.c.descendant_id==c.parent_id))]
+    conn.execute(t.insert(), rows)
+
+def subtree_ids(cid):
+    return {d for (d,) in db.session.query(CategoryClosure.descendant_id).filter_by(ancestor_id=cid)}
+
+def move(c, parent_id):
+    """Re-parent `c` (and everything under it) to `parent_id` or to the top level; caller commits.
+
+    Raises ValueError if the new parent is `c` itself or one of its descendants.
+    """
+    below = db.session.query(CategoryClosure.descendant_id, CategoryClosure.depth).filter_by(ancestor_id=c.id).all()
+    if parent_id in {d for d, _ in below}: raise ValueError("A category cannot be moved under itself.")
+    ids = [d for d, _ in below]
+    above = [a for (a,) in db.session.query(CategoryClosure.ancestor_id).filter(CategoryClosure.descendant_id==c.id, CategoryClosure.depth>0)]
+    if above:
+        CategoryClosure.query.filter(CategoryClosure.ancestor_id.in_(above), CategoryClosure.descendant_id.in_(ids))\
+            .delete(synchronize_session=False)
+    if parent_id:
+        new_above = db.session.query(CategoryClosure.ancestor_id, CategoryClosure.depth).filter_by(descendant_id=parent_id).all()
+        db.session.execute(CategoryClosure.__table__.insert(),
+                           [{"ancestor_id": a, "descendant_id": d, "depth": da + dd + 1} for a, da in new_above for d, dd in below])
+    c.parent_id = parent_id or None
+
+def delete(c):
+    """Delete a category, moving its children up to its parent; caller commits."""
+    # Ids are read first: MySQL cannot UPDATE a table it also selects from in a subquery.
+    above = [a for (a,) in db.session.query(CategoryClosure.ancestor_id).filter(CategoryClosure.descendant_id==c.id, CategoryClosure.depth>0)]
+    below = [d for (d,) in db.session.query(CategoryClosure.descendant_id).filter(CategoryClosure.ancestor_id==c.id, CategoryClosure.depth>0)]
+    if above and below:  # paths that ran through c get one step shorter
+        db.session.execute(update(CategoryClosure)
+                           .where(CategoryClosure.ancestor_id.in_(above), CategoryClosure.descendant_id.in_(below))
+                           .values(depth=CategoryClosure.depth - 1))
+    CategoryClosure.query.filter((CategoryClosure.ancestor_id==c.id) | (CategoryClosure.descendant_id==c.id))\
+        .delete(synchronize_session=False)
+    Category.query.filter_by(parent_id=c.id).update({Category.parent_id: c.parent_id}, synchronize_session=False)
+    db.session.delete(c)
+
+def rebuild():
+    """Recompute every closure row from Category.parent_id; returns the row count."""
+    parents = dict(db.session.query(Category.id, Category.parent_id))
+    rows = []
+    for cid in parents:
+        node, depth, seen = cid, 0, set()
+        while node in parents and node not in seen:  # `seen` guards against a parent cycle
+            rows.append({"ancestor_id": node, "descendant_id": cid, "depth": depth})
+            seen.add(node); node = parents[node]; depth += 1
+    CategoryClosure.query.delete(synchronize_session=False)
+    if rows: db.session.execute(CategoryClosure.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+def label(c, by_id):
+    """'Parent › Child' display name from a {id: CategoryInfo} map."""
+    names, seen = [], set()
+    while c is not None and c.id not in seen:
+        names.append(c.name); seen.add(c.id); c = by_id.get(c.parent_id)
+    return " › ".join(reversed(names))
@@ -0,0 +1,61 @@
+"""Duplicate detection on top of the indexed Transaction.dup_hash column.
+
+A row is a duplicate when the same user already had a live transaction with the
+same date, amount and normalized description before the current import began.
+Lookups are one `dup_hash IN (...)` query per chunk.
+"""
+import hashlib
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, func
+from .models import db, Transaction, dup_hash
+
+POLICIES = ("skip", "flag", "overwrite")
+FLAG_TAG = "duplicate"
+
+def hash_chunk(user_id, stamps, amounts, descs):
+    """dup_hash for a whole chunk: keys are built column-wise, then hashed in one pass."""
+    keys = (f"{user_id}|" + stamps.dt.strftime("%Y-%m-%d") + "|" + amounts.map("{:.2f}".format)
+            + "|" + descs.str.strip().str.lower())
+    sha = hashlib.sha256
+    return [sha(k.encode()).hexdigest() for k in keys]
+
+def id_floor():
+    """Highest transaction id now; rows above it belong to the import in progress."""
+    return db.session.query(func.max(Transaction.id)).scalar() or 0
+
+def existing(user_id, hashes, floor):
+    """The subset of `hashes` the user already had (live rows with id <= floor)."""
+    uniq = list(set(hashes))
+    if not uniq: return set()
+    q = db.session.query(Transaction.dup_hash).filter(
+        Transaction.user_id==user_id, Transaction.is_deleted==False, Transaction.id<=floor,
+        Transaction.dup_hash.in_(uniq)).distinct()
+    return {h for (h,) in q}
+
+def matching_rows(user_id, hashes, floor):
+    """(id, date, category_id, amount) of the live rows an overwrite would replace."""
+    return db.session.query(Transaction.id, Transaction.date, Transaction.category_id, Transaction.amount).filter(
+        Transaction.user_id==user_id, Transaction.is_deleted==False, Transaction.id<=floor,
+        Transaction.dup_hash.in_(list(hashes))).all()
+
+def rehash(batch=5000):
+    """Recompute dup_hash for every transaction (after the key format changes)."""
+    t = Transaction.__table__
+    stmt = t.update().where(t.c.id==bindparam("tid")).values(dup_hash=bindparam("h"))
+    n, last = 0, 0
+    while True:
+        rows = db.session.query(Transaction.id, Transaction.user_id, Transaction.date, Transaction.amount,
+                                Transaction.description).filter(Transaction.id>last).order_by(Transaction.id).limit(batch).all()
+        if not rows: break
+        db.session.execute(stmt, [{"tid": tid, "h": dup_hash(uid, d, amount, desc)} for tid, uid, d, amount, desc in rows])
+        db.session.commit()
+        n += len(rows); last = rows[-1][0]
+    return n
+
+cli = AppGroup("dedup", help="Duplicate-detection maintenance.")
+
+@cli.command("rehash")
+def rehash_command():
+    """Recompute dup_hash for all transactions."""
+    click.echo(f"Rehashed {rehash()} transactions.")
@@ -0,0 +1,44 @@
+"""Streaming transaction export.
+
+Rows are read with `yield_per` (a server-side cursor where the driver supports
+one) joined to Category, formatted in batches and yielded, optionally through a
+streaming gzip compressor, so peak memory does not depend on row count.
+"""
+import csv, io, json, zlib
+from .models import db, Category, Transaction
+from . import filters
+
+BATCH = 1000
+COLUMNS = ["date", "description", "amount", "category", "type", "tags"]
+
+def rows(user_id, f):
+    q = db.session.query(Transaction.date, Transaction.description, Transaction.amount, Category.name,
+                         Category.type, Transaction.tags)\
+        .join(Category, Transaction.category_id==Category.id)\
+        .filter(Transaction.user_id==user_id, Transaction.is_deleted==False)
+    return filters.apply(q, f, user_id).order_by(Transaction.id).yield_per(BATCH)
+
+def csv_chunks(user_id, f):
+    buf = io.StringIO(); writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for i, (d, desc, amount, cname, ctype, tags) in enumerate(rows(user_id, f), 1):
+        writer.writerow([d.isoformat(), desc, float(amount), cname, ctype, tags or ""])
+        if i % BATCH == 0:
+            yield buf.getvalue(); buf.seek(0); buf.truncate()
+    yield buf.getvalue()
+
+def ndjson_chunks(user_id, f):
+    out = []
+    for d, desc, amount, cname, ctype, tags in rows(user_id, f):
+        out.append(json.dumps({"date": d.isoformat(), "description": desc, "amount": float(amount),
+                               "category": cname, "type": ctype, "tags": tags or ""}))
+        if len(out) >= BATCH:
+            yield "\n".join(out) + "\n"; out = []
+    if out: yield "\n".join(out) + "\n"
+
+def gzipped(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = z.compress(chunk.encode())
+        if data: yield data
+    yield z.flush()
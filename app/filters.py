@@ -0,0 +1,81 @@
+"""Transaction filters and keyset pagination shared by the list, export and API endpoints.
+
+`parse` turns request args into a plain dict (invalid values are dropped);
+`apply` narrows a query that already selects from Transaction joined to Category.
+Tags are matched through the transaction_tag index and `q` through the
+full-text index (see search.py), falling back to a substring match when the
+database has none.
+`page` seeks on the (date desc, id desc) ordering, which the
+(user_id, is_deleted, date, id) index serves as a range scan at any depth.
+"""
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_, select
+from .models import db, Category, Tag, Transaction, TransactionTag
+from . import search, tag_index
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+ARGS = ("start", "end", "category_id", "type", "tag", "min_amount", "max_amount", "q")  # the query args `parse` reads
+
+def _date(v):
+    try: return date.fromisoformat(v) if v else None
+    except ValueError: return None
+
+def _int(v):
+    try: return int(v) if v not in (None, "") else None
+    except ValueError: return None
+
+def _dec(v):
+    try: return Decimal(v) if v not in (None, "") else None
+    except InvalidOperation: return None
+
+def _str(v):
+    v = (v or "").strip()
+    return v or None
+
+def parse(args):
+    f = {"start": _date(args.get("start")), "end": _date(args.get("end")), "category_id": _int(args.get("category_id")),
+         "type": args.get("type") if args.get("type") in ("income", "expense") else None,
+         "tag": _str(args.get("tag")), "min_amount": _dec(args.get("min_amount")), "max_amount": _dec(args.get("max_amount")),
+         "q": _str(args.get("q"))}
+    return {k: v for k, v in f.items() if v is not None}
+
+def apply(q, f, user_id):
+    if "start" in f: q = q.filter(Transaction.date>=f["start"])
+    if "end" in f: q = q.filter(Transaction.date<=f["end"])
+    if "category_id" in f: q = q.filter(Transaction.category_id==f["category_id"])
+    if "type" in f: q = q.filter(Category.type==f["type"])
+    if "min_amount" in f: q = q.filter(Transaction.amount>=f["min_amount"])
+    if "max_amount" in f: q = q.filter(Transaction.amount<=f["max_amount"])
+    if "tag" in f:
+        q = q.filter(Transaction.id.in_(select(TransactionTag.transaction_id).join(Tag, Tag.id==TransactionTag.tag_id)
+                                        .where(Tag.user_id==user_id, Tag.name==tag_index.normalize(f["tag"]))))
+    if "q" in f:
+        cond = search.match(f["q"])
+        q = q.filter(cond if cond is not None else Transaction.description.icontains(f["q"], autoescape=True))
+    return q
+
+def encode_cursor(t): return f"{t.date.isoformat()}_{t.id}"
+
+def decode_cursor(v):
+    try:
+        d, i = (v or "").split("_")
+        return date.fromisoformat(d), int(i)
+    except ValueError:
+        return None
+
+def page(user_id, f, cursor=None, limit=PAGE_SIZE):
+    """One page of live transactions, newest first. Returns (transactions, next_cursor)."""
+    limit = max(1, min(limit or PAGE_SIZE, MAX_PAGE_SIZE))
+    q = db.session.query(Transaction).join(Category, Transaction.category_id==Category.id)\
+        .filter(Transaction.user_id==user_id, Transaction.is_deleted==False)
+    q = apply(q, f, user_id)
+    after = decode_cursor(cursor)
+    if after:
+        d, i = after
+        q = q.filter(or_(Transaction.date<d, and_(Transaction.date==d, Transaction.id<i)))
+    items = q.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1).all()
+    more = len(items) > limit
+    items = items[:limit]
+    return items, (encode_cursor(items[-1]) if more else None)
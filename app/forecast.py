@@ -0,0 +1,190 @@
+"""Month-end spend forecasts per category, computed with NumPy.
+
+A user's expense history is read once as four flat columns (category, date,
+amount, description) and turned into arrays; no ORM objects are built.
+Recurring charges (same category, amount and description in at least
+MIN_RECURRING months, about once a month) are split out and projected on
+their usual day if not yet seen this month. Everything else is projected from
+a rolling daily rate over the last WINDOW_DAYS, shaped by each category's
+day-of-month profile from past months. Leaf projections are summed up the
+category tree, so parent budgets see their children as everywhere else.
+
+The history scan is the expensive part, so it runs only in `flask forecast run`
+(nightly, within a time budget) and results are stored in the Forecast table
+stamped with the date and the user's data version; page views read them and
+never compute or write a forecast.
+"""
+import calendar, time
+from datetime import date
+from decimal import Decimal
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Float, String, select, type_coerce, update
+from sqlalchemy.exc import IntegrityError
+from .models import db, Category, CategoryClosure, Forecast, Transaction, User
+from . import analytics
+from .instrumentation import timed
+
+WINDOW_DAYS = 90
+SHRINK_MONTHS = 4  # pseudo-months pulling day-of-month weights toward flat
+MIN_RECURRING = 3
+ZERO = Decimal("0")
+
+def _history(user_id):
+    """Plain (category_id, date, amount, description) tuples; coerced so no date or Decimal objects are built per row."""
+    return db.session.connection().execute(
+        select(Transaction.category_id, type_coerce(Transaction.date, String), type_coerce(Transaction.amount, Float),
+               Transaction.description)
+        .join(Category, Transaction.category_id==Category.id)
+        .where(Transaction.user_id==user_id, Transaction.is_deleted==False, Category.type=="expense")).all()
+
+def _recurring(np, key, month, dom, cur_month):
+    """(per-row recurring mask, per-key recurring mask, last month seen, usual day of month, row -> key index)."""
+    keys, inv = np.unique(key, return_inverse=True)
+    n = np.bincount(inv)
+    pairs = np.unique(inv.astype(np.int64) * 100000 + month)  # distinct (key, month)
+    months = np.bincount(pairs // 100000, minlength=len(keys))
+    first = np.full(len(keys), month.max()); np.minimum.at(first, inv, month)
+    last = np.full(len(keys), month.min()); np.maximum.at(last, inv, month)
+    span = last - first + 1
+    rec = (months >= MIN_RECURRING) & (n <= months * 1.25) & (months >= 0.75 * span) & (last >= cur_month - 2)
+    day = np.bincount(inv, weights=dom) / n
+    return rec[inv], rec, last, np.rint(day).astype(int), inv
+
+@timed("forecast.compute")
+def compute(user_id, today=None):
+    """{category_id: (spent, recurring due, projected)} for the current month, leaf totals rolled up to ancestors."""
+    import numpy as np  # only forecasting pays for the import
+    today = today or date.today()
+    rows = _history(user_id)
+    if not rows: return {}
+    cols = list(zip(*rows))
+    cat_ids, ci = np.unique(np.array(cols[0]), return_inverse=True)
+    dates = np.array(cols[1], dtype="datetime64[D]")
+    amt = np.array(cols[2], dtype=float)
+    desc = np.char.lower(np.char.strip(np.array([d or "" for d in cols[3]])))
+    month = dates.astype("datetime64[M]").astype(np.int64)
+    dom = (dates - dates.astype("datetime64[M]")).astype(np.int64) + 1
+    t = np.datetime64(today, "D")
+    cur_month = t.astype("datetime64[M]").astype(np.int64)
+    dim = calendar.monthrange(today.year, today.month)[1]
+    ncat = len(cat_ids)
+
+    spent = np.bincount(ci, weights=amt * (month == cur_month), minlength=ncat)
+
+    # Recurring charges: due this month if not seen yet and their usual day is still ahead.
+    cents = np.unique(np.round(amt * 100).astype(np.int64), return_inverse=True)[1]
+    descs = np.unique(desc, return_inverse=True)[1]
+    key = (ci * (cents.max() + 1) + cents) * (descs.max() + 1) + descs  # one int per (category, amount, description)
+    is_rec, rec, last, rec_day, inv = _recurring(np, key, month, dom, cur_month)
+    due_keys = rec & (last < cur_month) & (np.minimum(rec_day, dim) > today.day)
+    key_cat = np.zeros(len(rec), dtype=np.int64); key_cat[inv] = ci
+    key_amt = np.zeros(len(rec)); key_amt[inv] = amt
+    due = np.bincount(key_cat[due_keys], weights=key_amt[due_keys], minlength=ncat)
+
+    # Everything else: daily category x day matrix up to today.
+    start = min(dates.min(), t)
+    ndays = int((t - start).astype(np.int64)) + 1
+    day_idx = (dates - start).astype(np.int64)
+    keep = ~is_rec & (day_idx < ndays)
+    daily = np.zeros((ncat, ndays))
+    np.add.at(daily, (ci[keep], day_idx[keep]), amt[keep])
+    window = min(WINDOW_DAYS, ndays)
+    rate = daily[:, -window:].sum(axis=1) / window
+
+    # Day-of-month profile from whole months before this one, shrunk toward flat where history is thin.
+    axis_dates = start + np.arange(ndays)
+    past = axis_dates.astype("datetime64[M]").astype(np.int64) < cur_month
+    axis_dom = (axis_dates - axis_dates.astype("datetime64[M]")).astype(np.int64)[past]
+    onehot = np.zeros((past.sum(), 31)); onehot[np.arange(len(axis_dom)), axis_dom] = 1
+    by_dom, seen = daily[:, past] @ onehot, onehot.sum(axis=0)
+    mean = by_dom.sum(axis=1, keepdims=True) / max(seen.sum(), 1)
+    raw = np.divide(by_dom / np.maximum(seen, 1), mean, out=np.ones_like(by_dom), where=mean > 0)
+    weight = (seen * raw + SHRINK_MONTHS) / (seen + SHRINK_MONTHS)
+    remaining = rate * weight[:, today.day:dim].sum(axis=1) + due
+
+    # Roll leaf figures up the category tree.
+    closure = db.session.query(CategoryClosure.ancestor_id, CategoryClosure.descendant_id)\
+        .filter(CategoryClosure.descendant_id.in_(cat_ids.tolist())).all()
+    if not closure: closure = [(int(c), int(c)) for c in cat_ids]
+    anc_ids, ai = np.unique(np.array([a for a, _ in closure]), return_inverse=True)
+    di = np.searchsorted(cat_ids, np.array([d for _, d in closure]))
+    out = np.zeros((len(anc_ids), 3))
+    np.add.at(out, ai, np.stack([spent, due, spent + remaining], axis=1)[di])
+    D = lambda v: Decimal(f"{v:.2f}")
+    return {int(c): (D(s), D(r), D(p)) for c, (s, r, p) in zip(anc_ids, out) if p > 0}
+
+def _figures(rows):
+    return {f.category_id: (f.spent, f.recurring, f.projected) for f in rows if f.category_id is not None}
+
+def refresh(user_id, today=None):
+    """Recompute and store the user's forecast; returns {category_id: (spent, recurring due, projected)}.
+
+    The data version is bumped (leaving data_changed_at alone) so pages cached
+    before the new figures existed are not served again.
+    """
+    today = today or date.today()
+    db.session.execute(update(User).where(User.id==user_id).values(data_version=User.data_version + 1))
+    version = db.session.query(User.data_version).filter_by(id=user_id).scalar()
+    period = today.strftime("%Y-%m")
+    figures = compute(user_id, today)
+    Forecast.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    # With nothing to forecast a single NULL-category row still marks the user as done for today.
+    rows = [{"user_id": user_id, "period": period, "category_id": cid, "spent": s, "recurring": r, "projected": p,
+             "as_of": today, "data_version": version} for cid, (s, r, p) in (figures or {None: (ZERO,) * 3}).items()]
+    try:
+        db.session.execute(Forecast.__table__.insert(), rows); db.session.commit()
+    except IntegrityError:  # another worker stored the same forecast first
+        db.session.rollback()
+    return figures
+
+def current(user_id, today=None):
+    """{category_id: (spent, recurring due, projected)} for this month, or None before the nightly run has reached the user.
+
+    The stored forecast is carried forward: live spend from the rollups, plus
+    the stored spend still ahead scaled to the days left.
+    """
+    today = today or date.today()
+    period = today.strftime("%Y-%m")
+    rows = Forecast.query.filter_by(user_id=user_id).all()
+    if not rows or rows[0].period != period: return None
+    stored = _figures(rows)
+    version = db.session.get(User, user_id).data_version  # usually already loaded for login
+    if rows[0].as_of == today and rows[0].data_version == version: return stored
+    dim = calendar.monthrange(today.year, today.month)[1]
+    left = Decimal(dim - today.day) / (dim - rows[0].as_of.day) if dim > rows[0].as_of.day else Decimal("0")
+    live = analytics.subtree_totals(user_id, period)
+    out = {}
+    for cid in set(stored) | set(live):
+        was, due, proj = stored.get(cid, (ZERO,) * 3)
+        spent = live.get(cid, ZERO)
+        ahead = max(proj - was - due, ZERO) * left + due
+        out[cid] = (spent, due, (spent + ahead).quantize(Decimal("0.01")))
+    return out
+
+def run_batch(budget_s, today=None):
+    """Refresh out-of-date forecasts, most recently active users first, until `budget_s` seconds pass.
+
+    Returns (refreshed, left over); users left over keep any figures stored earlier this month, carried forward.
+    """
+    today = today or date.today()
+    deadline = time.monotonic() + budget_s
+    fresh = {uid for uid, v in db.session.query(Forecast.user_id, Forecast.data_version)
+             .join(User, User.id==Forecast.user_id).filter(Forecast.as_of==today, Forecast.data_version==User.data_version)}
+    users = [uid for uid, _ in db.session.query(User.id, User.data_changed_at)
+             .order_by(User.data_changed_at.is_(None), User.data_changed_at.desc()) if uid not in fresh]
+    done = 0
+    for uid in users:
+        if time.monotonic() >= deadline: break
+        refresh(uid, today); db.session.expunge_all(); done += 1
+    return done, len(users) - done
+
+cli = AppGroup("forecast", help="Month-end spend forecasts.")
+
+@cli.command("run")
+@click.option("--budget", "budget_s", type=float, default=600, help="Stop starting new users after this many seconds.")
+def run_command(budget_s):
+    """Refresh every user's forecast (nightly job)."""
+    t = time.monotonic()
+    done, left = run_batch(budget_s)
+    click.echo(f"Refreshed {done} forecasts in {time.monotonic() - t:.1f}s; {left} left for the next run.")
@@ -0,0 +1,188 @@
+"""Streaming CSV import.
+
+The upload is parsed in fixed-size chunks; dates, amounts and categories are
+handled column-wise per chunk, duplicates are found with one dup_hash lookup,
+rows go in with one executemany INSERT, and the chunk commits together with
+its rollup deltas. Memory is bounded by the chunk
+size, not the file size. `start_job` runs the same import on a background
+thread and records progress in ImportJob so any worker can report status.
+The thread dies with its web worker, so jobs carry the worker's host:pid and
+a heartbeat refreshed every chunk; `reap` fails jobs whose worker is gone or
+silent and removes their spooled uploads.
+"""
+import os, socket, threading, uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pandas as pd
+from sqlalchemy import func, update
+from .models import db, Category, Transaction, ImportJob
+from . import dedup, rollups, tag_index, category_cache, versions
+from .instrumentation import phase
+
+CHUNK_ROWS = 5000
+REQUIRED = {"date", "description", "amount", "type", "category"}  # plus an optional "tags" column
+
+class ImportFormatError(ValueError):
+    pass
+
+def _resolve_categories(names, types, cats):
+    """Map each (name, type) in the chunk to a category id, creating missing ones in one flush."""
+    keys = list(zip(names.str.lower(), types))
+    missing = {}
+    for (lname, ctype), name in zip(keys, names):
+        if (lname, ctype) not in cats and (lname, ctype) not in missing:
+            missing[(lname, ctype)] = Category(name=name, type=ctype)
+    if missing:
+        db.session.add_all(missing.values()); db.session.flush()
+        cats.update(missing); category_cache.invalidate()
+    return [cats[k].id for k in keys]
+
+def import_chunk(df, user_id, cats, policy="skip", floor=None):
+    """Insert one parsed chunk (caller commits).
+
+    Returns (rows written, duplicates found). Duplicates are dropped under
+    "skip", inserted with a `duplicate` tag under "flag", and replace the
+    matching existing rows (soft-deleted) under "overwrite".
+    """
+    df.columns = [c.lower() for c in df.columns]
+    if not REQUIRED.issubset(df.columns):
+        raise ImportFormatError("CSV must include columns: date, description, amount, type, category.")
+    if df.empty: return 0, 0
+    with phase("import.parse"):
+        stamps = pd.to_datetime(df["date"], format="mixed", errors="coerce")  # per value, as the row-wise parser did
+        amounts = pd.to_numeric(df["amount"], errors="coerce").astype(float).round(2)
+        bad = stamps.isna() | amounts.isna() | amounts.abs().eq(float("inf"))
+        if bad.any():
+            lines = [str(i + 2) for i in df.index[bad]]  # the header is line 1
+            raise ImportFormatError(f"Unreadable date or amount on line {', '.join(lines[:5])}"
+                                    + (f" and {len(lines) - 5} more" if len(lines) > 5 else "") + ".")
+        descs = df["description"].fillna("").astype(str)
+        hashes = dedup.hash_chunk(user_id, stamps, amounts, descs)
+    with phase("import.dedup"):
+        dups = dedup.existing(user_id, hashes, floor) if floor is not None else set()
+    is_dup = pd.Series([h in dups for h in hashes], index=df.index)
+    n_dup = int(is_dup.sum())
+    deltas = {}
+    if n_dup and policy == "skip":
+        keep = ~is_dup
+        df, stamps, amounts, descs = df[keep], stamps[keep], amounts[keep], descs[keep]
+        hashes = [h for h, d in zip(hashes, is_dup) if not d]; is_dup = is_dup[keep]
+        if df.empty: return 0, n_dup
+    version, now = versions.next_version(user_id), datetime.utcnow()  # Core writes skip the ORM stamp hook
+    if n_dup and policy == "overwrite":
+        old = dedup.matching_rows(user_id, dups, floor)
+        for _, d, cid, amount in old:
+            rollups.merge(deltas, {(rollups.period_of(d), cid): (-amount, -1)})
+        db.session.execute(update(Transaction).where(Transaction.id.in_([r[0] for r in old]))
+                           .values(is_deleted=True, version=version, updated_at=now))
+    names = df["category"].astype(str).str.strip()
+    types = df["type"].astype(str).str.strip().str.lower()
+    cat_ids = _resolve_categories(names, types, cats)
+
+    flag = policy == "flag"
+    row_tags = df["tags"].fillna("").astype(str).str.strip() if "tags" in df.columns else pd.Series("", index=df.index)
+    records = [{"user_id": user_id, "category_id": cid, "date": d, "amount": a, "description": desc,
+                "tags": ",".join(filter(None, [tg, dedup.FLAG_TAG if flag and dup else ""])), "dup_hash": h,
+                "version": version, "updated_at": now}
+               for cid, d, a, desc, h, dup, tg in zip(cat_ids, stamps.dt.date, amounts, descs, hashes, is_dup, row_tags)]
+    with phase("import.insert"):
+        before = db.session.query(func.max(Transaction.id)).scalar() or 0
+        db.session.execute(Transaction.__table__.insert(), records)
+        if any(r["tags"] for r in records): tag_index.index_new(user_id, before)
+
+    with phase("import.rollups"):
+        # Rollup deltas summed in integer cents so the totals stay exact.
+        cents = (amounts * 100).round().astype("int64")
+        grouped = pd.DataFrame({"period": stamps.dt.strftime("%Y-%m"), "cid": cat_ids, "cents": cents})\
+            .groupby(["period", "cid"])["cents"].agg(["sum", "count"])
+        rollups.merge(deltas, {(p, int(cid)): (Decimal(int(s)) / 100, int(n)) for (p, cid), (s, n) in grouped.iterrows()})
+        rollups.apply(user_id, deltas)
+    return len(records), n_dup
+
+def import_csv(fileobj, user_id, chunk_rows=CHUNK_ROWS, progress=None, policy="skip"):
+    """Stream `fileobj` into the user's transactions, committing once per chunk.
+
+    `progress(rows_done, chunks_done, duplicates)` is called before each chunk's
+    commit so it can write its own bookkeeping into the same transaction.
+    """
+    if policy not in dedup.POLICIES:
+        raise ImportFormatError(f"Unknown duplicate policy {policy!r}.")
+    cats = {(c.name.lower(), c.type): c for c in category_cache.all()}
+    floor = dedup.id_floor()
+    rows = chunks = dups = read = 0
+    try:
+        reader = pd.read_csv(fileobj, chunksize=chunk_rows)
+        while True:
+            with phase("import.read_csv"): df = next(reader, None)
+            if df is None: break
+            n, d = import_chunk(df, user_id, cats, policy, floor)
+            read += len(df); rows += n; dups += d; chunks += 1
+            if progress: progress(rows, chunks, dups)
+            with phase("import.commit"): db.session.commit()
+    except ImportFormatError as e:
+        db.session.rollback()
+        if read: raise ImportFormatError(f"{e} Lines from {read + 2} on were not imported; {rows} rows before them were.") from e
+        raise
+    except Exception:
+        db.session.rollback(); raise
+    finally:
+        category_cache.invalidate()
+    return {"rows": rows, "chunks": chunks, "duplicates": dups}
+
+HEARTBEAT_TIMEOUT = timedelta(minutes=10)
+
+def _worker(): return f"{socket.gethostname()}:{os.getpid()}"
+
+def _abandoned(job, now):
+    """True if the job's process is gone (same host) or has not reported in HEARTBEAT_TIMEOUT."""
+    if job.status not in ("queued", "running"): return False
+    host, _, pid = (job.worker or "").rpartition(":")
+    if host == socket.gethostname() and pid.isdigit():
+        try: os.kill(int(pid), 0)
+        except ProcessLookupError: return True
+        except PermissionError: pass
+    return now - (job.heartbeat_at or job.created_at or now) > HEARTBEAT_TIMEOUT
+
+def reap(jobs):
+    """Mark abandoned jobs among `jobs` failed and delete their spooled files; caller commits."""
+    now = datetime.utcnow()
+    for job in jobs:
+        if not _abandoned(job, now): continue
+        job.status, job.finished_at = "failed", now
+        job.error = f"Import stopped after {job.rows_done} rows: the worker running it ({job.worker}) exited."
+        if job.spool_path:
+            try: os.remove(job.spool_path)
+            except OSError: pass
+
+def _run_job(app, job_id, path, chunk_rows):
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        job.status, job.heartbeat_at = "running", datetime.utcnow(); db.session.commit()
+        def progress(rows, chunks, dups):
+            job.rows_done, job.chunks_done, job.duplicates = rows, chunks, dups
+            job.heartbeat_at = datetime.utcnow()
+        try:
+            with open(path, "rb") as f:
+                import_csv(f, job.user_id, chunk_rows, progress, job.policy)
+            job.status = "done"
+        except Exception as e:
+            job = db.session.get(ImportJob, job_id)
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = datetime.utcnow(); db.session.commit()
+            db.session.remove()
+            try: os.remove(path)
+            except FileNotFoundError: pass  # already removed by reap
+
+def start_job(app, upload, user_id, policy="skip", chunk_rows=CHUNK_ROWS):
+    """Spool `upload` to the instance folder and import it on a daemon thread."""
+    spool = os.path.join(app.instance_path, "imports")
+    os.makedirs(spool, exist_ok=True)
+    path = os.path.join(spool, f"{uuid.uuid4().hex}.csv")
+    upload.save(path)
+    reap(ImportJob.query.filter(ImportJob.status.in_(("queued", "running"))).all())  # jobs left behind by dead workers
+    job = ImportJob(user_id=user_id, filename=upload.filename or "", policy=policy, worker=_worker(),
+                    heartbeat_at=datetime.utcnow(), spool_path=path)
+    db.session.add(job); db.session.commit()
+    threading.Thread(target=_run_job, args=(app, job.id, path, chunk_rows), daemon=True).start()
+    return job
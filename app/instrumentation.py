@@ -0,0 +1,240 @@
+"""Request and SQL instrumentation.
+
+SQL statements are always counted per request (for the X-SQL-Queries header).
+With METRICS_ENABLED the app also records, per endpoint, a latency histogram,
+SQL statements and time per request, time spent in named phases (`phase` /
+`timed`, plus template rendering), and keeps samples of slow requests with
+their slowest queries. `/metrics` serves Prometheus text and `/metrics/slow`
+the samples as JSON, to a bearer METRICS_TOKEN or, without one, to logged-in
+admins only (slow samples carry SQL text and request paths).
+
+Each process keeps its own counters. When METRICS_DIR is set, every process
+periodically writes them to METRICS_DIR/<pid>.json and a scrape merges all
+files, so any gunicorn worker can answer for all of them; clear the directory
+on deploy, as with prometheus_client's multiprocess mode.
+"""
+import functools, glob, hmac, json, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+from flask import Response, abort, current_app, g, has_request_context, jsonify, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+FAMILIES = {
+    "budget_request_duration_seconds": ("histogram", "Request latency, including streamed bodies.", LATENCY_BUCKETS),
+    "budget_request_sql_statements": ("histogram", "SQL statements issued per request.", SQL_BUCKETS),
+    "budget_phase_duration_seconds": ("histogram", "Time per request spent in a named phase.", LATENCY_BUCKETS),
+    "budget_sql_duration_seconds_total": ("counter", "Time spent executing SQL.", None),
+    "budget_slow_requests_total": ("counter", "Requests slower than SLOW_REQUEST_MS.", None),
+}
+FLUSH_SECONDS = 5
+SLOW_SAMPLES = 20
+MAX_TRACKED_QUERIES = 200
+
+_lock = threading.Lock()
+_hist = {}      # (family, labels) -> [bucket counts..., sum, count]
+_counters = {}  # (family, labels) -> value
+_slow = deque(maxlen=SLOW_SAMPLES)
+_last_flush = 0.0
+
+# --- SQL events ---
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_queries = g.get("sql_queries", 0) + 1
+        if "metrics_queries" in g: conn.info["metrics_t0"] = time.perf_counter()
+
+def _time_statement(conn, cursor, statement, parameters, context, executemany):
+    t0 = conn.info.pop("metrics_t0", None)
+    if t0 is None or not (has_request_context() and "metrics_queries" in g): return
+    elapsed = time.perf_counter() - t0
+    g.metrics_sql_seconds += elapsed
+    if len(g.metrics_queries) < MAX_TRACKED_QUERIES:
+        g.metrics_queries.append((elapsed, statement))
+
+def query_count():
+    """Number of SQL statements issued so far while handling the current request."""
+    return g.get("sql_queries", 0)
+
+# --- phases ---
+
+@contextmanager
+def phase(name):
+    """Add the block's wall time to the current request's `name` phase (no-op when metrics are off)."""
+    if not (has_request_context() and "metrics_phases" in g):
+        yield; return
+    t = time.perf_counter()
+    try: yield
+    finally:
+        ph = g.metrics_phases; ph[name] = ph.get(name, 0.0) + time.perf_counter() - t
+
+def timed(name):
+    """Decorator form of `phase`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name): return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def _template_started(sender, template, context, **extra):
+    if has_request_context() and "metrics_phases" in g: g.metrics_template_t0 = time.perf_counter()
+
+def _template_done(sender, template, context, **extra):
+    if has_request_context() and "metrics_template_t0" in g:
+        ph = g.metrics_phases; ph["render_template"] = ph.get("render_template", 0.0) + time.perf_counter() - g.pop("metrics_template_t0")
+
+# --- registry ---
+
+def _observe(family, labels, value):
+    buckets = FAMILIES[family][2]
+    key = (family, labels)
+    h = _hist.get(key)
+    if h is None: h = _hist[key] = [0] * (len(buckets) + 2)
+    for i, b in enumerate(buckets):
+        if value <= b: h[i] += 1
+    h[-2] += value; h[-1] += 1
+
+def _inc(family, labels, value=1):
+    _counters[(family, labels)] = _counters.get((family, labels), 0) + value
+
+def _record(app, ctx_g, endpoint, method, status, elapsed):
+    sql_count, sql_seconds = ctx_g.get("sql_queries", 0), ctx_g.metrics_sql_seconds
+    with _lock:
+        _observe("budget_request_duration_seconds", (("endpoint", endpoint), ("method", method), ("status", status)), elapsed)
+        _observe("budget_request_sql_statements", (("endpoint", endpoint),), sql_count)
+        _inc("budget_sql_duration_seconds_total", (("endpoint", endpoint),), sql_seconds)
+        for name, secs in ctx_g.metrics_phases.items():
+            _observe("budget_phase_duration_seconds", (("endpoint", endpoint), ("phase", name)), secs)
+        if elapsed * 1000 >= app.config["SLOW_REQUEST_MS"]:
+            _inc("budget_slow_requests_total", (("endpoint", endpoint),))
+            sample = {"at": time.time(), "pid": os.getpid(), "endpoint": endpoint, "method": method, "path": ctx_g.metrics_path,
+                      "status": int(status), "ms": round(elapsed * 1000, 1), "sql_statements": sql_count,
+                      "sql_ms": round(sql_seconds * 1000, 1),
+                      "phases_ms": {k: round(v * 1000, 1) for k, v in ctx_g.metrics_phases.items()},
+                      "slowest_queries": [{"ms": round(s * 1000, 2), "sql": q[:500]}
+                                          for s, q in sorted(ctx_g.metrics_queries, key=lambda x: x[0], reverse=True)[:10]]}
+            _slow.append(sample)
+            app.logger.warning("slow request %s %s: %.0f ms, %d SQL statements (%.0f ms)",
+                               method, sample["path"], sample["ms"], sql_count, sample["sql_ms"])
+    _maybe_flush(app)
+
+def _snapshot():
+    with _lock:
+        return {"hist": [[f, [list(p) for p in l], list(v)] for (f, l), v in _hist.items()],
+                "counters": [[f, [list(p) for p in l], v] for (f, l), v in _counters.items()],
+                "slow": list(_slow)}
+
+def _maybe_flush(app, force=False):
+    global _last_flush
+    path = app.config.get("METRICS_DIR")
+    if not path or (not force and time.monotonic() - _last_flush < FLUSH_SECONDS): return
+    _last_flush = time.monotonic()
+    os.makedirs(path, exist_ok=True)
+    target = os.path.join(path, f"{os.getpid()}.json")
+    tmp = f"{target}.tmp"
+    with open(tmp, "w") as f: json.dump(_snapshot(), f)
+    os.replace(tmp, target)
+
+def _collect(app):
+    """Snapshots from every process sharing METRICS_DIR (or just this one)."""
+    path = app.config.get("METRICS_DIR")
+    if not path: return [_snapshot()]
+    _maybe_flush(app, force=True)
+    out = []
+    for name in glob.glob(os.path.join(path, "*.json")):
+        try:
+            with open(name) as f: out.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # a worker is mid-write or the file is damaged; skip it this scrape
+    return out
+
+def _merge(snapshots):
+    hist, counters = {}, {}
+    for s in snapshots:
+        for f, l, v in s["hist"]:
+            key = (f, tuple(tuple(p) for p in l))
+            cur = hist.setdefault(key, [0] * len(v))
+            for i, x in enumerate(v): cur[i] += x
+        for f, l, v in s["counters"]:
+            key = (f, tuple(tuple(p) for p in l))
+            counters[key] = counters.get(key, 0) + v
+    return hist, counters
+
+def _esc(v): return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(labels, extra=()):
+    parts = [f'{k}="{_esc(v)}"' for k, v in labels + tuple(extra)]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v): return repr(float(v)) if isinstance(v, float) else str(v)
+
+def render_prometheus(snapshots):
+    hist, counters = _merge(snapshots)
+    lines = []
+    for family, (kind, help_, buckets) in FAMILIES.items():
+        lines += [f"# HELP {family} {help_}", f"# TYPE {family} {kind}"]
+        if kind == "histogram":
+            for (f, labels), v in sorted(hist.items()):
+                if f != family: continue
+                for b, n in zip(buckets, v):
+                    lines.append(f"{family}_bucket{_fmt_labels(labels, [('le', b)])} {n}")
+                lines += [f"{family}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {v[-1]}",
+                          f"{family}_sum{_fmt_labels(labels)} {_num(v[-2])}",
+                          f"{family}_count{_fmt_labels(labels)} {v[-1]}"]
+        else:
+            lines += [f"{family}{_fmt_labels(labels)} {_num(v)}" for (f, labels), v in sorted(counters.items()) if f == family]
+    return "\n".join(lines) + "\n"
+
+# --- views ---
+
+def _check_token():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"): abort(403)
+        return
+    from flask_login import current_user
+    if not (current_user.is_authenticated and current_user.is_admin): abort(403)
+
+def metrics_view():
+    _check_token()
+    return Response(render_prometheus(_collect(current_app)), mimetype="text/plain; version=0.0.4")
+
+def slow_view():
+    _check_token()
+    samples = [s for snap in _collect(current_app) for s in snap.get("slow", [])]
+    return jsonify(sorted(samples, key=lambda s: s["at"], reverse=True)[:SLOW_SAMPLES])
+
+def init_app(app):
+    if not event.contains(Engine, "before_cursor_execute", _count_statement):
+        event.listen(Engine, "before_cursor_execute", _count_statement)
+    if app.config.get("SQL_QUERY_HEADER"):
+        @app.after_request
+        def _query_header(resp):
+            resp.headers["X-SQL-Queries"] = str(query_count())
+            return resp
+    if not app.config.get("METRICS_ENABLED"): return
+
+    if not event.contains(Engine, "after_cursor_execute", _time_statement):
+        event.listen(Engine, "after_cursor_execute", _time_statement)
+    template_rendered.connect(_template_done, app)
+    before_render_template.connect(_template_started, app)
+
+    @app.before_request
+    def _start_metrics():
+        g.metrics_t0, g.metrics_path = time.perf_counter(), request.path
+        g.metrics_phases, g.metrics_queries, g.metrics_sql_seconds = {}, [], 0.0
+
+    @app.after_request
+    def _finish_metrics(resp):
+        if "metrics_t0" not in g: return resp
+        # Recorded when the body is closed so streamed exports count their full duration.
+        ctx_g, endpoint, method = g._get_current_object(), request.endpoint or "unmatched", request.method
+        resp.call_on_close(lambda: _record(app, ctx_g, endpoint, method, str(resp.status_code),
+                                           time.perf_counter() - ctx_g.metrics_t0))
+        return resp
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    app.add_url_rule("/metrics/slow", "metrics_slow", slow_view)
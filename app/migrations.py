@@ -0,0 +1,82 @@
+"""Versioned schema migrations, run explicitly instead of at app start.
+
+    flask --app run db upgrade   # apply pending migrations (the Procfile release step)
+    flask --app run db seed      # admin user and default categories, if missing
+    flask --app run db status
+
+Each migration is a numbered step recorded in the schema_version table once
+it commits, so workers never create or alter tables while booting. Steps must
+be safe on a database that already has the change (a fresh database gets every
+table from the first step's create_all): additive DDL goes through `_sync`,
+data steps check before they write. Append new steps; never renumber.
+"""
+import click
+from flask.cli import AppGroup
+from sqlalchemy import inspect
+from .models import db, SchemaVersion, Transaction
+from . import category_tree, dedup, rollups, schema, search, tag_index
+
+def _sync():
+    """Create missing tables and add missing columns/indexes (see schema.upgrade)."""
+    db.create_all()
+    schema.upgrade()
+
+def _stamp_existing():
+    """Rows written before versions existed keep version 0; give them an updated_at."""
+    Transaction.query.filter(Transaction.updated_at.is_(None))\
+        .update({Transaction.updated_at: Transaction.created_at}, synchronize_session=False)
+
+MIGRATIONS = [
+    (1, "create tables and add missing columns/indexes", _sync),
+    (2, "backfill monthly rollups", rollups.ensure_backfilled),
+    (3, "category closure table", lambda: (_sync(), category_tree.rebuild())),
+    (4, "tag index and description full-text search", lambda: (_sync(), search.install(), tag_index.backfill())),
+    (5, "forecast table", _sync),
+    (6, "transaction versions for the sync API", lambda: (_sync(), _stamp_existing())),
+    (7, "rehash duplicate-detection keys (per user, two-decimal amounts)", dedup.rehash),
+    (8, "import job heartbeats", _sync),
+]
+
+def applied():
+    if not inspect(db.engine).has_table(SchemaVersion.__tablename__): return set()
+    return {v for (v,) in db.session.query(SchemaVersion.version)}
+
+def pending():
+    done = applied()
+    return [(v, name, fn) for v, name, fn in MIGRATIONS if v not in done]
+
+def upgrade():
+    """Apply pending migrations in order, committing after each; returns [(version, name)] applied."""
+    SchemaVersion.__table__.create(db.engine, checkfirst=True)
+    ran = []
+    for v, name, fn in pending():
+        try:
+            fn()
+            db.session.add(SchemaVersion(version=v, name=name)); db.session.commit()
+        except Exception:
+            db.session.rollback(); raise
+        ran.append((v, name))
+    return ran
+
+cli = AppGroup("db", help="Schema migrations and seed data.")
+
+@cli.command("upgrade")
+def upgrade_command():
+    """Apply pending schema migrations."""
+    ran = upgrade()
+    for v, name in ran: click.echo(f"Applied {v}: {name}")
+    if not ran: click.echo("Schema is up to date.")
+
+@cli.command("status")
+def status_command():
+    """Show applied and pending migrations."""
+    done = applied()
+    for v, name, _ in MIGRATIONS:
+        click.echo(f"{'applied' if v in done else 'pending'}  {v}: {name}")
+
+@cli.command("seed")
+def seed_command():
+    """Create the admin user and default categories if missing."""
+    from . import ensure_seed_data
+    ensure_seed_data()
+    click.echo("Seed data present.")
@@ -1,4 +1,5 @@
 from datetime import datetime
+from decimal import Decimal
 import hashlib
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -10,6 +11,8 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    data_version = db.Column(db.Integer, default=0, nullable=False)  # bumped by versions.bump on any data change
+    data_changed_at = db.Column(db.DateTime, nullable=True)
     def set_password(self, password): self.password_hash = generate_password_hash(password)
     def check_password(self, password): return check_password_hash(self.password_hash, password)
 
@@ -22,7 +25,15 @@ class Category(db.Model):
     type = db.Column(db.String(10), nullable=False)  # income|expense
     parent_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
 
+class CategoryClosure(db.Model):
+    """One row per (ancestor, descendant) pair, including each category with itself at depth 0."""
+    ancestor_id = db.Column(db.Integer, primary_key=True)
+    descendant_id = db.Column(db.Integer, primary_key=True, index=True)
+    depth = db.Column(db.Integer, nullable=False, default=0)
+
 class Transaction(db.Model):
+    __table_args__ = (db.Index("ix_transaction_user_live_date", "user_id", "is_deleted", "date", "id"),
+                      db.Index("ix_transaction_user_version", "user_id", "version", "id"))
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
@@ -33,9 +44,26 @@ class Transaction(db.Model):
     is_deleted = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     dup_hash = db.Column(db.String(64), index=True)
-    def compute_dup_hash(self):
-        key = f"{self.date.isoformat()}|{self.amount}|{(self.description or '').strip().lower()}"
-        return hashlib.sha256(key.encode()).hexdigest()
+    updated_at = db.Column(db.DateTime, nullable=True)
+    version = db.Column(db.Integer, default=0, nullable=False)  # User.data_version of the last write, see versions.stamp
+    def compute_dup_hash(self): return dup_hash(self.user_id, self.date, self.amount, self.description)
+
+def dup_hash(user_id, d, amount, description):
+    # Keep in step with dedup.hash_chunk, which builds the same key column-wise.
+    key = f"{user_id}|{d.isoformat()}|{Decimal(str(amount)):.2f}|{(description or '').strip().lower()}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+class Tag(db.Model):
+    __table_args__ = (db.UniqueConstraint("user_id", "name", name="uq_tag_user_name"),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(64), nullable=False)  # normalized, see tag_index.parse
+
+class TransactionTag(db.Model):
+    """Normalized index of Transaction.tags; the comma string stays the display form."""
+    __table_args__ = (db.Index("ix_transaction_tag_tag", "tag_id", "transaction_id"),)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tag.id'), primary_key=True)
 
 class Budget(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -45,8 +73,62 @@ class Budget(db.Model):
     target_amount = db.Column(db.Numeric(12,2), nullable=False)
 
 class Report(db.Model):
+    __table_args__ = (db.Index("ix_report_user_period", "user_id", "period"),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     period = db.Column(db.String(10), nullable=False)  # YYYY-MM or YYYY-Qn
     summary_json = db.Column(db.Text)
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    watermark = db.Column(db.String(40))  # digest of the period's rollup rows and budgets when generated
+    is_stale = db.Column(db.Boolean, default=False)
+
+class MonthlyRollup(db.Model):
+    __table_args__ = (db.UniqueConstraint("user_id", "period", "category_id", name="uq_rollup_user_period_cat"),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    period = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    type = db.Column(db.String(10), nullable=False)  # income|expense, copied from the category
+    total = db.Column(db.Numeric(14,2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class Forecast(db.Model):
+    """A user's month-end projection per category (subtree totals), see forecast.py."""
+    __table_args__ = (db.UniqueConstraint("user_id", "category_id", name="uq_forecast_user_cat"),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    category_id = db.Column(db.Integer, nullable=True)  # NULL: user had nothing to forecast
+    spent = db.Column(db.Numeric(14,2), nullable=False, default=0)
+    recurring = db.Column(db.Numeric(14,2), nullable=False, default=0)  # recurring charges still due
+    projected = db.Column(db.Numeric(14,2), nullable=False, default=0)
+    as_of = db.Column(db.Date, nullable=False)
+    data_version = db.Column(db.Integer, nullable=False)  # User.data_version it was computed from
+
+class ImportJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(255), default="")
+    status = db.Column(db.String(10), nullable=False, default="queued")  # queued|running|done|failed
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    chunks_done = db.Column(db.Integer, nullable=False, default=0)
+    duplicates = db.Column(db.Integer, nullable=False, default=0)
+    policy = db.Column(db.String(10), nullable=False, default="skip")  # skip|flag|overwrite
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    worker = db.Column(db.String(128))  # host:pid of the process running it
+    heartbeat_at = db.Column(db.DateTime)  # refreshed every chunk; see importer.reap
+    spool_path = db.Column(db.String(512))
+    def to_dict(self):
+        return {"id": self.id, "status": self.status, "filename": self.filename, "rows_done": self.rows_done,
+                "chunks_done": self.chunks_done, "duplicates": self.duplicates,
+                "policy": self.policy, "error": self.error,
+                "created_at": self.created_at.isoformat() if self.created_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                "heartbeat_at": self.heartbeat_at.isoformat() if self.heartbeat_at else None}
+
+class SchemaVersion(db.Model):
+    version = db.Column(db.Integer, primary_key=True)  # one row per applied migration (see migrations.py)
+    name = db.Column(db.String(120), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
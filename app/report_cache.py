@@ -0,0 +1,109 @@
+"""Report snapshots: Report.summary_json is a cache, not a log.
+
+A stored summary is served while it is not marked stale and its watermark (a
+digest of the covered months' rollup rows and budgets) still matches. Rollup
+writes and budget changes mark the affected months, and the quarters and years
+containing them, stale, so browsing reports performs no writes unless something
+actually changed. Quarter and year summaries are built from month summaries.
+"""
+import hashlib, json
+from concurrent.futures import as_completed
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from .models import db, Budget, MonthlyRollup, Report
+from . import analytics
+from .instrumentation import timed
+from .workers import call, pool
+
+@timed("report.watermark")
+def watermark(user_id, period):
+    months = analytics.period_months(period)
+    h = hashlib.sha1()
+    for row in db.session.query(MonthlyRollup.period, MonthlyRollup.category_id, MonthlyRollup.total, MonthlyRollup.count)\
+            .filter(MonthlyRollup.user_id==user_id, MonthlyRollup.period.in_(months))\
+            .order_by(MonthlyRollup.period, MonthlyRollup.category_id):
+        h.update(f"r{row[0]}:{row[1]}:{row[2]}:{row[3]};".encode())
+    for row in db.session.query(Budget.period, Budget.category_id, Budget.target_amount)\
+            .filter(Budget.user_id==user_id, Budget.period.in_(months)).order_by(Budget.period, Budget.category_id):
+        h.update(f"b{row[0]}:{row[1]}:{row[2]};".encode())
+    return h.hexdigest()
+
+def invalidate(user_id, periods):
+    """Mark cached reports for these YYYY-MM months (and their quarters/years) stale; caller commits."""
+    keys = {p for p in periods if analytics.is_month(p)}  # budgets saved before periods were validated may be anything
+    for p in list(keys): keys.update(analytics.containing_periods(p))
+    if not keys: return
+    Report.query.filter(Report.user_id==user_id, Report.period.in_(keys))\
+        .update({Report.is_stale: True}, synchronize_session=False)
+
+def invalidate_all():
+    """Category changes can rename rows in any summary."""
+    Report.query.update({Report.is_stale: True}, synchronize_session=False)
+
+def active_months(user_id, months):
+    """The months in `months` that have transactions or budgets for the user."""
+    have = {p for (p,) in db.session.query(MonthlyRollup.period).filter(
+        MonthlyRollup.user_id==user_id, MonthlyRollup.period.in_(months), MonthlyRollup.count>0).distinct()}
+    have |= {p for (p,) in db.session.query(Budget.period).filter(Budget.user_id==user_id, Budget.period.in_(months)).distinct()}
+    return sorted(have)
+
+def summary(user_id, period):
+    """The period's summary, regenerated and stored only when the cached one is out of date."""
+    months = analytics.period_months(period)
+    rep = Report.query.filter_by(user_id=user_id, period=period).first()
+    wm = watermark(user_id, period)
+    if rep and rep.summary_json and not rep.is_stale and rep.watermark == wm:
+        data = json.loads(rep.summary_json)
+        if "by_tag" in data: return data  # older snapshots predate per-tag totals
+    if months == [period]:
+        data = analytics.month_summary(user_id, period)
+    else:
+        data = analytics.combine_summaries({m: summary(user_id, m) for m in active_months(user_id, months)})
+    if not rep: rep = Report(user_id=user_id, period=period); db.session.add(rep)
+    rep.summary_json, rep.watermark, rep.is_stale, rep.generated_at = json.dumps(data), wm, False, datetime.utcnow()
+    db.session.commit()
+    return data
+
+def periods_for(months):
+    """Report periods to precompute for a set of months: the months, then their quarters, then years."""
+    months = sorted(set(months))
+    quarters = sorted({analytics.containing_periods(m)[0] for m in months})
+    years = sorted({analytics.containing_periods(m)[1] for m in months})
+    return months + quarters + years
+
+# --- batch precompute ---
+
+def _precompute_user(user_id, since, until):
+    months = [p for (p,) in db.session.query(MonthlyRollup.period).filter(
+        MonthlyRollup.user_id==user_id, MonthlyRollup.period>=since, MonthlyRollup.period<=until).distinct()]
+    periods = periods_for(months)
+    for p in periods: summary(user_id, p)
+    return user_id, len(periods)
+
+def precompute(since, until, workers=None):
+    """Generate all users' reports for [since, until] across a process pool; returns {user_id: reports}."""
+    user_ids = [u for (u,) in db.session.query(MonthlyRollup.user_id).filter(
+        MonthlyRollup.period>=since, MonthlyRollup.period<=until).distinct()]
+    db.session.remove()
+    if not user_ids: return {}
+    done = {}
+    with pool(workers) as ex:
+        futures = [ex.submit(call, _precompute_user, uid, since, until) for uid in user_ids]
+        for fut in as_completed(futures):
+            uid, n = fut.result(); done[uid] = n
+    return done
+
+cli = AppGroup("reports", help="Report generation.")
+
+@cli.command("precompute")
+@click.option("--since", required=True, help="First month, YYYY-MM.")
+@click.option("--until", default=None, help="Last month, YYYY-MM (default: current month).")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+def precompute_command(since, until, workers):
+    """Generate month, quarter and year reports for every user."""
+    until = until or datetime.utcnow().strftime("%Y-%m")
+    for p in (since, until):
+        if not analytics.is_month(p): raise click.BadParameter(f"{p} is not a YYYY-MM month")
+    done = precompute(since, until, workers)
+    click.echo(f"Generated {sum(done.values())} reports for {len(done)} users.")
@@ -0,0 +1,186 @@
+"""PDF rendering for reports.
+
+`render` turns a Report summary plus the period's transactions into a PDF
+(headline figures, a category chart and table, budget variance, a month
+breakdown for quarters/years and a paginated transactions appendix).
+`pdf_bytes` caches the output under the instance folder keyed by a hash of
+the summary, its watermark and a marker of the period's rows, so repeat
+downloads neither load the rows nor render. `render_zip` renders many
+user/period reports on a process pool (`flask reports render-zip`).
+reportlab is imported inside `render` so only PDF requests pay for it.
+"""
+import hashlib, io, json, os, zipfile
+from xml.sax.saxutils import escape
+from concurrent.futures import as_completed
+from datetime import datetime
+import click
+from flask import current_app
+from sqlalchemy import func
+from . import analytics, report_cache
+from .instrumentation import timed
+from .workers import call, pool
+
+RENDER_VERSION = "4"  # bump when the layout changes so cached files are not reused
+CACHE_MAX_FILES = 500
+
+def title(period):
+    n = len(analytics.period_months(period))
+    return f"{'Monthly' if n==1 else 'Quarterly' if n==3 else 'Annual'} Report - {period}"
+
+@timed("pdf.render")
+def render(period, summary, rows):
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import LongTable, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    grid = TableStyle([("GRID", (0,0), (-1,-1), 0.25, colors.grey), ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#e9ecef")),
+                       ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"), ("FONTSIZE", (0,0), (-1,-1), 9),
+                       ("ALIGN", (1,0), (-1,-1), "RIGHT")])
+    money = lambda v: f"{v:,.2f}"
+    story = [Paragraph(title(period), styles["Title"]),
+             Table([["Income", "Expense", "Balance"],
+                    [money(summary["income"]), money(summary["expense"]), money(summary["balance"])]],
+                   colWidths=[5*cm]*3, style=grid),
+             Spacer(1, 0.6*cm)]
+
+    by_cat = summary.get("by_category") or summary.get("top3", {})
+    if by_cat:
+        top = list(by_cat.items())[:10]
+        d = Drawing(16*cm, 0.6*cm*len(top) + 1*cm)
+        chart = HorizontalBarChart()
+        chart.x, chart.y, chart.width, chart.height = 4*cm, 0.5*cm, 11*cm, 0.6*cm*len(top)
+        chart.data = [[v for _, v in reversed(top)]]
+        chart.categoryAxis.categoryNames = [k for k, _ in reversed(top)]
+        chart.categoryAxis.labels.fontSize = 8; chart.valueAxis.labels.fontSize = 8
+        chart.valueAxis.valueMin = 0
+        chart.bars[0].fillColor = colors.HexColor("#dc3545")
+        d.add(chart)
+        total = sum(by_cat.values()) or 1
+        story += [Paragraph("Expenses by Category", styles["Heading2"]), d,
+                  Table([["Category", "Amount", "Share"]] + [[k, money(v), f"{v/total*100:.1f}%"] for k, v in by_cat.items()],
+                        colWidths=[8*cm, 4*cm, 3*cm], style=grid, repeatRows=1),
+                  Spacer(1, 0.6*cm)]
+
+    if summary.get("by_group"):
+        story += [Paragraph("By Category Group", styles["Heading2"]),
+                  Table([["Group", "Spent (incl. sub-categories)"]] + [[k, money(v)] for k, v in summary["by_group"].items()],
+                        colWidths=[8*cm, 6*cm], style=grid, repeatRows=1),
+                  Spacer(1, 0.6*cm)]
+
+    if summary.get("by_tag"):
+        story += [Paragraph("By Tag", styles["Heading2"]),
+                  Table([["Tag", "Spent"]] + [[k, money(v)] for k, v in summary["by_tag"].items()],
+                        colWidths=[8*cm, 6*cm], style=grid, repeatRows=1),
+                  Spacer(1, 0.6*cm)]
+
+    story.append(Paragraph("Budget Variance", styles["Heading2"]))
+    if summary.get("variance"):
+        var_style = TableStyle(grid.getCommands() + [("TEXTCOLOR", (3,i), (3,i), colors.red if v["delta"] > 0 else colors.green)
+                                                    for i, v in enumerate(summary["variance"], 1)])
+        story.append(Table([["Category", "Spent", "Budget", "Delta"]] +
+                           [[v["category"], money(v["spent"]), money(v["budget"]), money(v["delta"])] for v in summary["variance"]],
+                           colWidths=[6*cm, 3*cm, 3*cm, 3*cm], style=var_style, repeatRows=1))
+    else:
+        story.append(Paragraph("No budgets set for this period.", styles["Normal"]))
+
+    if summary.get("months"):
+        story += [Spacer(1, 0.6*cm), Paragraph("By Month", styles["Heading2"]),
+                  Table([["Month", "Income", "Expense", "Balance"]] +
+                        [[m["period"], money(m["income"]), money(m["expense"]), money(m["balance"])] for m in summary["months"]],
+                        colWidths=[4*cm, 3.5*cm, 3.5*cm, 3.5*cm], style=grid, repeatRows=1)]
+
+    if rows:
+        cell = styles["BodyText"].clone("cell", fontSize=8, leading=9)
+        story += [PageBreak(), Paragraph("Appendix: Transactions", styles["Heading2"]),
+                  LongTable([["Date", "Description", "Category", "Type", "Amount"]] +
+                            [[d.isoformat(), Paragraph(escape(desc or ""), cell), cname, ctype, money(float(a))]
+                             for d, a, ctype, cname, desc in rows],
+                            colWidths=[2.3*cm, 7.2*cm, 3.3*cm, 1.8*cm, 2.6*cm], style=grid, repeatRows=1)]
+
+    def footer(canvas, doc):
+        canvas.setFont("Helvetica", 8)
+        canvas.drawRightString(A4[0] - 2*cm, 1.2*cm, f"{period} - page {doc.page}")
+
+    buf = io.BytesIO()
+    SimpleDocTemplate(buf, pagesize=A4, title=title(period), leftMargin=2*cm, rightMargin=2*cm,
+                      topMargin=2*cm, bottomMargin=2*cm).build(story, onFirstPage=footer, onLaterPages=footer)
+    return buf.getvalue()
+
+def content_key(user_id, period, summary):
+    """Cache key from everything the PDF shows, without loading the period's rows.
+
+    The summary and its Report watermark stand for the figures; the appendix is
+    covered by the live rows' count and highest version, since every write
+    stamps the rows it touches with a new version (see versions.stamp).
+    """
+    from .models import db, Transaction
+    start, end = analytics.period_bounds(period)
+    top, n = db.session.query(func.max(Transaction.version), func.count(Transaction.id)).filter(
+        Transaction.user_id==user_id, Transaction.is_deleted==False, Transaction.date>=start, Transaction.date<end).one()
+    h = hashlib.sha256(f"{RENDER_VERSION}|{user_id}|{period}|{report_cache.watermark(user_id, period)}|{top}|{n}|".encode())
+    h.update(json.dumps(summary, sort_keys=True).encode())
+    return h.hexdigest()
+
+def _cache_dir():
+    path = os.path.join(current_app.instance_path, "pdf_cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _prune(path):
+    files = sorted(os.scandir(path), key=lambda e: e.stat().st_mtime)
+    for e in files[:max(0, len(files) - CACHE_MAX_FILES)]:
+        try: os.remove(e.path)
+        except OSError: pass
+
+def pdf_bytes(user_id, period):
+    """The rendered report, from the on-disk cache when its inputs have not changed."""
+    summary = report_cache.summary(user_id, period)
+    path = os.path.join(_cache_dir(), f"{content_key(user_id, period, summary)}.pdf")
+    try:
+        with open(path, "rb") as f: return f.read()
+    except FileNotFoundError:
+        pass
+    data = render(period, summary, analytics.transaction_rows(user_id, *analytics.period_bounds(period)))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f: f.write(data)
+    os.replace(tmp, path)
+    _prune(os.path.dirname(path))
+    return data
+
+# --- batch rendering ---
+
+def _render_one(user_id, period):
+    return user_id, period, pdf_bytes(user_id, period)
+
+def render_zip(jobs, out, workers=None):
+    """Render [(user_id, period)] into zip file `out` as user_<id>/report_<period>.pdf; returns count."""
+    n = 0
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf, pool(workers) as ex:
+        for fut in as_completed([ex.submit(call, _render_one, uid, p) for uid, p in jobs]):
+            uid, period, data = fut.result()
+            zf.writestr(f"user_{uid}/report_{period}.pdf", data); n += 1
+    return n
+
+@click.command("render-zip")
+@click.option("--since", required=True, help="First month, YYYY-MM.")
+@click.option("--until", default=None, help="Last month, YYYY-MM (default: current month).")
+@click.option("--user-id", type=int, multiple=True, help="Limit to these users (repeatable).")
+@click.option("--out", default="reports.zip", show_default=True, help="Zip file to write.")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+def render_zip_command(since, until, user_id, out, workers):
+    """Render month, quarter and year PDFs for many users into one zip."""
+    from .models import db, MonthlyRollup
+    until = until or datetime.utcnow().strftime("%Y-%m")
+    q = db.session.query(MonthlyRollup.user_id, MonthlyRollup.period).filter(
+        MonthlyRollup.period>=since, MonthlyRollup.period<=until, MonthlyRollup.count>0)
+    if user_id: q = q.filter(MonthlyRollup.user_id.in_(user_id))
+    months = {}
+    for uid, p in q.distinct(): months.setdefault(uid, []).append(p)
+    db.session.remove()
+    jobs = [(uid, p) for uid, ms in sorted(months.items()) for p in report_cache.periods_for(ms)]
+    click.echo(f"Rendered {render_zip(jobs, out, workers)} reports into {out}.")
@@ -0,0 +1,79 @@
+"""Materialized user x month x category totals.
+
+Every write path that adds, edits or soft-deletes a Transaction also applies the
+matching delta here inside the same session, so the dashboard and summary.json
+can read months x categories rows instead of the user's full history.
+"""
+from decimal import Decimal
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, select, update
+from .models import db, Category, Transaction, MonthlyRollup
+from . import analytics, report_cache, versions
+
+def period_of(d): return d.strftime("%Y-%m")
+
+def delta_for(t, sign=1):
+    """The rollup contribution of one transaction (sign=-1 removes it)."""
+    return {(period_of(t.date), t.category_id): (Decimal(str(t.amount)) * sign, sign)}
+
+def merge(into, deltas):
+    for k, (amt, cnt) in deltas.items():
+        a, c = into.get(k, (Decimal("0"), 0)); into[k] = (a + amt, c + cnt)
+    return into
+
+def apply(user_id, deltas):
+    """Add {(period, category_id): (amount, count)} into the user's rollup rows.
+
+    Existing rows are found with one SELECT and updated with one executemany
+    `total = total + :amount` (so concurrent writers never lose updates); the
+    rest go in with one bulk INSERT, typed from Category. The caller commits
+    together with the transaction rows it changed. Cached reports for the
+    touched periods are marked stale, and the user's data version bumped, in
+    the same transaction.
+    """
+    report_cache.invalidate(user_id, [period for period, _ in deltas])
+    versions.bump(user_id)
+    deltas = {k: v for k, v in deltas.items() if v[0] or v[1]}
+    if not deltas: return
+    t = MonthlyRollup.__table__
+    have = set(db.session.execute(select(t.c.period, t.c.category_id).where(
+        t.c.user_id==user_id, t.c.period.in_({p for p, _ in deltas}), t.c.category_id.in_({c for _, c in deltas}))).all())
+    changed = [{"p": p, "c": c, "amt": amt, "cnt": cnt} for (p, c), (amt, cnt) in deltas.items() if (p, c) in have]
+    if changed:
+        db.session.execute(update(t).where(t.c.user_id==user_id, t.c.period==bindparam("p"), t.c.category_id==bindparam("c"))
+                           .values(total=t.c.total + bindparam("amt"), count=t.c.count + bindparam("cnt")), changed)
+    missing = [k for k in deltas if k not in have]
+    if missing:
+        types = dict(db.session.query(Category.id, Category.type).filter(Category.id.in_({c for _, c in missing})))
+        db.session.execute(t.insert(), [{"user_id": user_id, "period": p, "category_id": c, "type": types.get(c, "expense"),
+                                         "total": deltas[p, c][0], "count": deltas[p, c][1]} for p, c in missing])
+
+def track(t, sign=1): apply(t.user_id, delta_for(t, sign))
+
+def rebuild(user_id=None):
+    """Recompute rollup rows from the transactions table (all users, or one)."""
+    d = MonthlyRollup.query
+    if user_id is not None: d = d.filter_by(user_id=user_id)
+    d.delete(synchronize_session=False)
+    rows = [{"user_id": uid, "period": period, "category_id": cid, "type": ctype, "total": total, "count": cnt}
+            for uid, period, cid, ctype, total, cnt in analytics.monthly_category_totals(user_id)]
+    if rows: db.session.execute(MonthlyRollup.__table__.insert(), rows)
+    if user_id is None: report_cache.invalidate_all(); versions.bump_all()
+    else: report_cache.invalidate(user_id, {r["period"] for r in rows}); versions.bump(user_id)
+    db.session.commit()
+    return len(rows)
+
+def ensure_backfilled():
+    """Populate an empty rollup table from existing data (first boot after upgrade)."""
+    if MonthlyRollup.query.first() is None and Transaction.query.filter_by(is_deleted=False).first() is not None:
+        rebuild()
+
+cli = AppGroup("rollups", help="Maintain the monthly rollup table.")
+
+@cli.command("rebuild")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user's rows.")
+def rebuild_command(user_id):
+    """Recompute monthly rollups from transactions."""
+    n = rebuild(user_id)
+    click.echo(f"Rebuilt {n} rollup rows.")
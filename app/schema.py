@@ -0,0 +1,39 @@
+"""Additive schema upgrades for databases created by an older version.
+
+`db.create_all()` creates missing tables but never touches existing ones, so
+this adds any model column or index the live table lacks. Only additive
+changes are handled; nothing is dropped or altered.
+"""
+from sqlalchemy import inspect, text
+from .models import db
+
+def _column_ddl(table, col, dialect):
+    ddl = f"ALTER TABLE {dialect.identifier_preparer.format_table(table)} ADD COLUMN " \
+          f"{dialect.identifier_preparer.format_column(col)} {col.type.compile(dialect=dialect)}"
+    default = col.default.arg if col.default is not None and col.default.is_scalar else None
+    if default is not None:
+        lit = {True: "1", False: "0"}.get(default) if isinstance(default, bool) else \
+              (str(default) if isinstance(default, (int, float)) else "'" + str(default).replace("'", "''") + "'")
+        ddl += f" DEFAULT {lit}"
+        if not col.nullable: ddl += " NOT NULL"
+    return ddl
+
+def upgrade():
+    """Add missing columns and indexes; returns the DDL statements that were run."""
+    engine = db.engine
+    insp = inspect(engine)
+    existing_tables = set(insp.get_table_names())
+    ran = []
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables: continue
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in have:
+                    ddl = _column_ddl(table, col, engine.dialect)
+                    conn.execute(text(ddl)); ran.append(ddl)
+            idx_have = {i["name"] for i in insp.get_indexes(table.name)}
+            for idx in table.indexes:
+                if idx.name not in idx_have:
+                    idx.create(conn); ran.append(f"CREATE INDEX {idx.name}")
+    return ran
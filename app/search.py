@@ -0,0 +1,66 @@
+"""Full-text search over Transaction.description.
+
+SQLite gets an external-content FTS5 table (transaction_fts) kept current by
+triggers, so bulk Core inserts are indexed too; MySQL gets a FULLTEXT index.
+`install` creates either (migration 4). `match` turns a search box query into
+a prefix-matching condition on Transaction, or returns None where no index
+exists (other databases, or SQLite built without FTS5) so callers fall back
+to LIKE.
+"""
+import re
+from sqlalchemy import column, inspect, text
+from .models import db, Transaction
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transaction_fts USING fts5(description, content='transaction', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS transaction_fts_ai AFTER INSERT ON "transaction" BEGIN
+         INSERT INTO transaction_fts(rowid, description) VALUES (new.id, new.description); END""",
+    """CREATE TRIGGER IF NOT EXISTS transaction_fts_ad AFTER DELETE ON "transaction" BEGIN
+         INSERT INTO transaction_fts(transaction_fts, rowid, description) VALUES ('delete', old.id, old.description); END""",
+    """CREATE TRIGGER IF NOT EXISTS transaction_fts_au AFTER UPDATE OF description ON "transaction" BEGIN
+         INSERT INTO transaction_fts(transaction_fts, rowid, description) VALUES ('delete', old.id, old.description);
+         INSERT INTO transaction_fts(rowid, description) VALUES (new.id, new.description); END""",
+    """INSERT INTO transaction_fts(transaction_fts) VALUES ('rebuild')""",
+]
+MYSQL_INDEX = "ft_transaction_description"
+
+_available = {}  # engine url -> bool
+
+def install():
+    """Create the dialect's full-text index over descriptions (idempotent); returns True if one exists."""
+    engine = db.engine
+    _available.pop(str(engine.url), None)
+    if engine.dialect.name == "sqlite":
+        try:
+            with engine.begin() as conn:
+                for stmt in SQLITE_DDL: conn.execute(text(stmt))
+        except Exception as e:  # sqlite3 built without FTS5
+            if "fts5" not in str(e).lower(): raise
+    elif engine.dialect.name == "mysql":
+        if MYSQL_INDEX not in {i["name"] for i in inspect(engine).get_indexes("transaction")}:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE `transaction` ADD FULLTEXT INDEX {MYSQL_INDEX} (description)"))
+    return available()
+
+def available():
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _available:
+        if engine.dialect.name == "sqlite":
+            _available[key] = inspect(engine).has_table("transaction_fts")
+        elif engine.dialect.name == "mysql":
+            _available[key] = MYSQL_INDEX in {i["name"] for i in inspect(engine).get_indexes("transaction")}
+        else:
+            _available[key] = False
+    return _available[key]
+
+def match(q):
+    """A condition matching descriptions containing words starting with each word of `q`, or None."""
+    words = re.findall(r"\w+", q)
+    if not words or not available(): return None
+    if db.engine.dialect.name == "sqlite":
+        expr = " ".join('"' + w + '"*' for w in words)
+        return Transaction.id.in_(text("SELECT rowid FROM transaction_fts WHERE transaction_fts MATCH :fts_q")
+                                  .bindparams(fts_q=expr).columns(column("rowid")))
+    expr = " ".join(f"+{w}*" for w in words)
+    return text("MATCH (`transaction`.description) AGAINST (:fts_q IN BOOLEAN MODE)").bindparams(fts_q=expr)
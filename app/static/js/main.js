@@ -16,6 +16,13 @@ function renderDashboard(d){
   var cm = d.cm_categories || d.categories || [];
   Plotly.newPlot('cmCatChart', [{labels: cm.map(c=>c.category), values: cm.map(c=>c.amount), type: 'pie', hole: 0.45}], {margin:{t:20}});
 
+  var tree = d.cm_category_tree || [];
+  if(tree.some(n=>n.parent!=="")){
+    document.getElementById('cmTreeRow').classList.remove('d-none');
+    Plotly.newPlot('cmTreeChart', [{type:'sunburst', ids: tree.map(n=>String(n.id)), parents: tree.map(n=>String(n.parent)),
+      labels: tree.map(n=>n.category), values: tree.map(n=>n.amount), branchvalues:'total'}], {margin:{t:10, l:0, r:0, b:0}});
+  }
+
   var daily = d.daily_cum || [];
   Plotly.newPlot('cumChart', [
     {x: daily.map(r=>r.day), y: daily.map(r=>r.spent_cum), type:'scatter', mode:'lines+markers', name:'Spent'},
@@ -39,6 +46,13 @@ function renderDashboard(d){
   });
 }
 
+function renderForecast(d, f){
+  // Extend the cumulative chart from today's spend to the projected month-end total.
+  if(!(d.daily_cum||[]).length || !f.projected_total || f.day >= f.days_in_month) return;
+  Plotly.addTraces('cumChart', {x: [f.day, f.days_in_month], y: [f.spent_total, f.projected_total],
+    type:'scatter', mode:'lines', line:{dash:'dot'}, name:'Forecast'});
+}
+
 (function(){
   const btn = document.getElementById('themeToggle');
   const apply = (mode)=>{
@@ -55,16 +69,3 @@ function renderDashboard(d){
     });
   }
 })();
-
-(function(){
-  const inp = document.getElementById('txnSearch');
-  if(!inp) return;
-  const table = document.getElementById('txnTable');
-  inp.addEventListener('input', ()=>{
-    const q = inp.value.toLowerCase();
-    Array.from(table.tBodies[0].rows).forEach(r=>{
-      const t = Array.from(r.cells).map(c=>c.textContent.toLowerCase()).join(' ');
-      r.style.display = t.includes(q)?'':'none';
-    });
-  });
-})();
@@ -0,0 +1,141 @@
+"""Batch writes and incremental reads of transactions for API clients.
+
+`apply_batch` runs a list of create/update/delete operations for one user in
+one database transaction and reports a result per item; the rollup deltas are
+applied once and tag links rebuilt in bulk, as the CSV import does.
+`changes` pages through the user's rows in (version, id) order. Every write
+stamps its rows with the user's next data version (versions.stamp), so a row
+written after a client's cursor always sorts after it: clients that keep the
+returned cursor see every later create, edit and soft delete.
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, func, or_
+from .models import db, Transaction, dup_hash
+from . import category_cache, rollups, tag_index, versions
+
+MAX_BATCH = 500
+PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+OPS = ("create", "update", "delete")
+REQUIRED = ("date", "amount", "category_id")
+MAX_AMOUNT = Decimal(10) ** 10  # Transaction.amount is Numeric(12, 2)
+
+class ItemError(ValueError):
+    pass
+
+def _is_id(v): return isinstance(v, int) and not isinstance(v, bool)  # True == 1 in Python
+
+def _fields(item, partial=False):
+    """Validated column values from one batch item; raises ItemError."""
+    out = {}
+    if not partial:
+        for k in REQUIRED:
+            if k not in item: raise ItemError(f"{k} is required")
+    if "date" in item:
+        try: out["date"] = date.fromisoformat(item["date"])
+        except (TypeError, ValueError): raise ItemError("date must be YYYY-MM-DD")
+    if "amount" in item:
+        try: d = Decimal(str(item["amount"]))
+        except InvalidOperation: raise ItemError("amount must be a number")
+        if not d.is_finite(): raise ItemError("amount must be a finite number")
+        if abs(d) >= MAX_AMOUNT: raise ItemError("amount is too large")
+        out["amount"] = d.quantize(Decimal("0.01"))
+    if "category_id" in item:
+        cid = item["category_id"]
+        if isinstance(cid, bool) or not isinstance(cid, int) or category_cache.get(cid) is None:
+            raise ItemError("unknown category_id")
+        out["category_id"] = cid
+    for k in ("description", "tags"):
+        if k in item:
+            v = "" if item[k] is None else item[k]
+            if not isinstance(v, str) or len(v) > 255: raise ItemError(f"{k} must be a string of at most 255 characters")
+            out[k] = v
+    return out
+
+def apply_batch(user_id, items, atomic=False):
+    """Apply create/update/delete `items` for the user; returns (per-item results, committed).
+
+    Items that fail validation, refer to another user's or a missing row, or
+    carry a `base_version` the row has moved past are reported and skipped;
+    with `atomic` any such item rolls the whole batch back. Creates go in with
+    one executemany INSERT, like an import chunk.
+    """
+    ids = [it["id"] for it in items if isinstance(it, dict) and _is_id(it.get("id"))]
+    rows = {t.id: t for t in Transaction.query.filter(Transaction.user_id==user_id, Transaction.id.in_(ids))} if ids else {}
+    results, created, written, retag, deltas = [], [], [], [], {}
+    for i, it in enumerate(items):
+        res = {"index": i}
+        if isinstance(it, dict) and "client_id" in it: res["client_id"] = it["client_id"]
+        results.append(res)
+        try:
+            op = it.get("op") if isinstance(it, dict) else None
+            if op not in OPS: raise ItemError("op must be one of create, update, delete")
+            if op == "create":
+                r = dict({"description": "", "tags": ""}, **_fields(it), user_id=user_id, is_deleted=False)
+                r["dup_hash"] = dup_hash(user_id, r["date"], r["amount"], r["description"])
+                rollups.merge(deltas, {(rollups.period_of(r["date"]), r["category_id"]): (r["amount"], 1)})
+                res["status"] = "created"; created.append((res, r)); continue
+            t = rows.get(it["id"]) if _is_id(it.get("id")) else None
+            if t is None: raise ItemError("not found")
+            if "base_version" in it and it["base_version"] != t.version:
+                res.update(status="conflict", id=t.id, version=t.version); continue
+            if op == "delete":
+                if not t.is_deleted: rollups.merge(deltas, rollups.delta_for(t, -1)); t.is_deleted = True
+                res["status"] = "deleted"
+            else:
+                if t.is_deleted: raise ItemError("transaction is deleted")
+                fields = _fields(it, partial=True)
+                rollups.merge(deltas, rollups.delta_for(t, -1))
+                for k, v in fields.items(): setattr(t, k, v)
+                t.dup_hash = t.compute_dup_hash()
+                rollups.merge(deltas, rollups.delta_for(t))
+                res["status"] = "updated"
+                if "tags" in fields: retag.append(t)
+            written.append((res, t))
+        except ItemError as e:
+            res.update(status="error", error=str(e))
+    if atomic and any(r["status"] in ("error", "conflict") for r in results):
+        db.session.rollback()
+        for r in results:
+            if r["status"] not in ("error", "conflict"): r["status"] = "skipped"
+        return results, False
+    db.session.flush()  # versions.stamp gives every updated or deleted row the new version
+    for res, t in written: res["id"], res["version"] = t.id, t.version
+    tag_index.set_many(user_id, retag)
+    if created:
+        version, now = versions.next_version(user_id), datetime.utcnow()  # Core insert skips the stamp hook
+        before = db.session.query(func.max(Transaction.id)).scalar() or 0
+        db.session.execute(Transaction.__table__.insert(), [dict(r, version=version, updated_at=now) for _, r in created])
+        new_ids = [tid for (tid,) in db.session.query(Transaction.id).filter(
+            Transaction.user_id==user_id, Transaction.id>before).order_by(Transaction.id)]
+        for (res, _), tid in zip(created, new_ids): res["id"], res["version"] = tid, version
+        if any(r["tags"] for _, r in created): tag_index.index_new(user_id, before)
+    if deltas: rollups.apply(user_id, deltas)
+    db.session.commit()
+    return results, True
+
+def encode_cursor(version, tid): return f"{version}_{tid}"
+
+def decode_cursor(v):
+    """'version_id' -> (version, id); empty means from the start, None if malformed."""
+    if not v: return 0, 0
+    try:
+        version, tid = v.split("_")
+        return int(version), int(tid)
+    except ValueError:
+        return None
+
+def changes(user_id, after, limit=PAGE_SIZE):
+    """Rows written after the (version, id) cursor, oldest first, soft-deleted ones included.
+
+    Returns (transactions, cursor to resume from, whether more rows are waiting).
+    """
+    limit = max(1, min(limit or PAGE_SIZE, MAX_PAGE_SIZE))
+    v, i = after
+    items = Transaction.query.filter(Transaction.user_id==user_id,
+                                     or_(Transaction.version>v, and_(Transaction.version==v, Transaction.id>i)))\
+        .order_by(Transaction.version, Transaction.id).limit(limit + 1).all()
+    more = len(items) > limit
+    items = items[:limit]
+    return items, (encode_cursor(items[-1].version, items[-1].id) if items else encode_cursor(v, i)), more
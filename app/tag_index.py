@@ -0,0 +1,74 @@
+"""Normalized tags: Tag (per user) and TransactionTag links mirror Transaction.tags.
+
+The comma string on Transaction stays what users see and edit; every write
+path updates the links as well (`set_for` on add/edit, `set_many` for API
+batches, `index_new` after an import chunk's bulk insert), so tag filters and
+per-tag totals are index lookups on transaction_tag(tag_id) rather than LIKE
+scans. `backfill` builds the links for rows written before the table existed.
+"""
+from sqlalchemy import exists
+from .models import db, Tag, Transaction, TransactionTag
+
+MAX_LEN = 64
+
+def normalize(name): return " ".join(name.lower().split())[:MAX_LEN]
+
+def parse(s):
+    """'Travel, work,travel' -> ['travel', 'work'] (normalized, de-duplicated, order kept)."""
+    out = []
+    for part in (s or "").split(","):
+        n = normalize(part)
+        if n and n not in out: out.append(n)
+    return out
+
+def ensure(user_id, names):
+    """{name: tag_id} for `names`, creating the user's missing tags."""
+    names = set(names)
+    if not names: return {}
+    have = dict(db.session.query(Tag.name, Tag.id).filter(Tag.user_id==user_id, Tag.name.in_(names)))
+    missing = [Tag(user_id=user_id, name=n) for n in names - set(have)]
+    if missing:
+        db.session.add_all(missing); db.session.flush()
+        have.update((t.name, t.id) for t in missing)
+    return have
+
+def _link(user_id, pairs):
+    """Insert links for [(transaction_id, tags string)]."""
+    parsed = [(tid, parse(s)) for tid, s in pairs]
+    ids = ensure(user_id, {n for _, names in parsed for n in names})
+    rows = [{"transaction_id": tid, "tag_id": ids[n]} for tid, names in parsed for n in names]
+    if rows: db.session.execute(TransactionTag.__table__.insert(), rows)
+    return len(rows)
+
+def set_for(t):
+    """Replace the links of one flushed transaction with its current tags; caller commits."""
+    TransactionTag.query.filter_by(transaction_id=t.id).delete(synchronize_session=False)
+    _link(t.user_id, [(t.id, t.tags)])
+
+def set_many(user_id, txns):
+    """`set_for` for many flushed transactions of one user in a few statements; caller commits."""
+    if not txns: return
+    TransactionTag.query.filter(TransactionTag.transaction_id.in_([t.id for t in txns])).delete(synchronize_session=False)
+    _link(user_id, [(t.id, t.tags) for t in txns])
+
+def index_new(user_id, after_id):
+    """Link the user's tagged rows with id > after_id that have no links yet (bulk-inserted rows)."""
+    rows = db.session.query(Transaction.id, Transaction.tags).filter(
+        Transaction.user_id==user_id, Transaction.id>after_id, Transaction.tags!="", Transaction.tags.isnot(None),
+        ~exists().where(TransactionTag.transaction_id==Transaction.id)).all()
+    return _link(user_id, rows)
+
+def backfill(batch=5000):
+    """Build links for every tagged transaction that has none; returns links written."""
+    n, last = 0, 0
+    while True:
+        rows = db.session.query(Transaction.id, Transaction.user_id, Transaction.tags).filter(
+            Transaction.id>last, Transaction.tags!="", Transaction.tags.isnot(None),
+            ~exists().where(TransactionTag.transaction_id==Transaction.id)).order_by(Transaction.id).limit(batch).all()
+        if not rows: break
+        by_user = {}
+        for tid, uid, s in rows: by_user.setdefault(uid, []).append((tid, s))
+        for uid, pairs in by_user.items(): n += _link(uid, pairs)
+        db.session.commit()
+        last = rows[-1][0]
+    return n
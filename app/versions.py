@@ -0,0 +1,105 @@
+"""Per-user data versions and the HTTP caching built on them.
+
+`User.data_version` is bumped in the same database transaction as any change
+to the user's transactions (via `rollups.apply`), budgets or categories
+(`bump_all`, since categories are shared). Views decorated with `conditional`
+send an ETag and Last-Modified derived from it and answer a matching
+conditional request with 304 before doing any work; the user row is already
+loaded for login, so that costs no extra query. `cached_json` keeps a bounded
+per-process LRU of serialized payloads keyed by user and version. Every
+written Transaction row also records the version it was written at, which
+the sync API pages on.
+"""
+import functools, hashlib, threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timezone
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from .models import db, Transaction, User
+
+LRU_SIZE = 512
+_lock = threading.Lock()
+_payloads = OrderedDict()
+
+def bump(user_id):
+    """Mark the user's data changed; caller commits."""
+    db.session.execute(update(User).where(User.id==user_id)
+                       .values(data_version=User.data_version + 1, data_changed_at=datetime.utcnow()))
+
+def next_version(user_id):
+    """Bump the user's data version and return the new value, to stamp rows written in this transaction.
+
+    The bump locks the user's row (the database, on SQLite) until commit, so
+    versions are handed out in commit order and a sync cursor never skips a row.
+    """
+    bump(user_id)
+    return db.session.query(User.data_version).filter_by(id=user_id).scalar()
+
+@event.listens_for(Session, "before_flush")
+def stamp(db_session, flush_context, instances):
+    """Stamp new and changed transactions with a fresh version and updated_at (for /api/transactions/changes).
+
+    Core bulk writes (the importer) bypass the ORM and stamp their rows from `next_version` themselves.
+    """
+    by_user = {}
+    for t in list(db_session.new) + list(db_session.dirty):
+        if isinstance(t, Transaction) and (t in db_session.new or db_session.is_modified(t)):
+            by_user.setdefault(t.user_id, []).append(t)
+    now = datetime.utcnow()
+    for user_id, txns in by_user.items():
+        v = next_version(user_id)
+        for t in txns: t.version, t.updated_at = v, now
+
+def bump_all():
+    """Category changes can alter every user's views: one UPDATE for all users; caller commits."""
+    db.session.execute(update(User).values(data_version=User.data_version + 1, data_changed_at=datetime.utcnow()))
+
+def _validators(parts, daily):
+    u = current_user
+    changed = u.data_changed_at or u.created_at or datetime(1970, 1, 1)
+    if daily:  # output depends on today's date (current month, alerts)
+        today = date.today()
+        changed = max(changed, datetime.combine(today, time.min)); parts = parts + (today.isoformat(),)
+    key = "|".join(str(p) for p in (u.id, u.data_version) + parts)
+    return hashlib.sha1(key.encode()).hexdigest()[:24], changed.replace(microsecond=0, tzinfo=timezone.utc)
+
+def _is_current(etag, last_modified):
+    if request.if_none_match: return request.if_none_match.contains_weak(etag)
+    return bool(request.if_modified_since) and last_modified <= request.if_modified_since
+
+def _stamp(resp, etag, last_modified):
+    resp.set_etag(etag, weak=True); resp.last_modified = last_modified
+    resp.cache_control.private = True; resp.cache_control.no_cache = True
+    return resp
+
+def conditional(daily=False, extra=()):
+    """View decorator (below login_required): validators from the user's data version, the
+    endpoint, its arguments and query string; 304 when the client's copy is current."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Pages rendered with flash messages are one-offs: never validated or answered with 304.
+            if session.get("_flashes"): return fn(*args, **kwargs)
+            parts = (request.endpoint, sorted(kwargs.items()), request.query_string.decode()) + tuple(extra)
+            etag, last_modified = _validators(parts, daily)
+            if _is_current(etag, last_modified):
+                return _stamp(current_app.response_class(status=304), etag, last_modified)
+            resp = make_response(fn(*args, **kwargs))
+            return _stamp(resp, etag, last_modified) if resp.status_code == 200 else resp
+        return wrapper
+    return deco
+
+def cached_json(name, build, daily=False):
+    """`build()` serialized to JSON, reused while the user's data version (and, if daily, the date) holds."""
+    key = (current_user.id, current_user.data_version, name, date.today() if daily else None)
+    with _lock:
+        body = _payloads.get(key)
+        if body is not None:
+            _payloads.move_to_end(key); return body
+    body = current_app.json.response(build()).get_data()  # byte-for-byte what jsonify sends
+    with _lock:
+        _payloads[key] = body
+        while len(_payloads) > LRU_SIZE: _payloads.popitem(last=False)
+    return body
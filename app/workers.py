@@ -0,0 +1,25 @@
+"""Process pools for the batch CLI commands (`reports precompute`, `reports render-zip`).
+
+Workers are spawned, not forked, and each builds its own app, and with it its
+own engine and connection pool. Submit module-level functions through `call`
+so they run inside that app's context with a fresh session.
+"""
+import multiprocessing, os
+from concurrent.futures import ProcessPoolExecutor
+
+_app = None
+
+def _init():
+    global _app
+    from . import create_app
+    _app = create_app()
+
+def call(fn, *args):
+    from .models import db
+    with _app.app_context():
+        try: return fn(*args)
+        finally: db.session.remove()
+
+def pool(workers=None):
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init)
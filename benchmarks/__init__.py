@@ -0,0 +1 @@
+"""Benchmarks for the budgeting app. Run modules with `python -m benchmarks.<name>`."""
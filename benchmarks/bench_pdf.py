@@ -0,0 +1,52 @@
+"""Report PDF rendering throughput on a large synthetic month.
+
+    python -m benchmarks.bench_pdf --rows 5000 --repeat 3
+
+Builds a throwaway SQLite database, renders the month's report `--repeat`
+times without the file cache and prints pages/second as JSON.
+"""
+import argparse, json, os, random, re, tempfile, time
+from datetime import date
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--period", default="2025-03")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import create_app, ensure_seed_data, migrations
+    from app.models import db, Category, Transaction, User
+    from app import analytics, report_cache, report_render, rollups
+
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(); ensure_seed_data()
+        user = User(email="bench@example.com"); user.set_password("x"); db.session.add(user); db.session.commit()
+        cats = [c.id for c in Category.query.filter_by(type="expense")]
+        rnd = random.Random(42)
+        y, m = map(int, args.period.split("-"))
+        db.session.execute(Transaction.__table__.insert(), [
+            {"user_id": user.id, "category_id": rnd.choice(cats), "date": date(y, m, rnd.randint(1, 28)),
+             "amount": round(rnd.uniform(1, 5000), 2), "description": f"Synthetic purchase {i}", "tags": ""}
+            for i in range(args.rows)])
+        db.session.commit()
+        rollups.rebuild(user.id)
+        summary = report_cache.summary(user.id, args.period)
+        start, end = analytics.period_bounds(args.period)
+        rows = analytics.transaction_rows(user.id, start, end)
+
+        timings, pages = [], 0
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            pdf = report_render.render(args.period, summary, rows)
+            timings.append(time.perf_counter() - t)
+            pages = len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+    best = min(timings)
+    print(json.dumps({"rows": args.rows, "pages": pages, "seconds_best": round(best, 3),
+                      "seconds_mean": round(sum(timings)/len(timings), 3), "pages_per_second": round(pages/best, 1)}))
+
+if __name__ == "__main__":
+    main()
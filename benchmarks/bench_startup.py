@@ -0,0 +1,65 @@
+"""Worker boot cost: import time, create_app() time and first-request latency, each in a fresh interpreter.
+
+    python -m benchmarks.bench_startup --runs 10
+    git worktree add /tmp/before <rev> && python -m benchmarks.bench_startup --tree /tmp/before
+
+The database is prepared once beforehand (as a release step would), so the
+numbers are what every gunicorn worker pays on (re)start. `--tree` measures
+another checkout of the app, e.g. an older revision, for before/after runs.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+PREPARE = """
+from app import create_app
+app = create_app()
+with app.app_context():
+    try:
+        from app import ensure_seed_data, migrations
+    except ImportError:
+        pass  # older trees set the schema up inside create_app
+    else:
+        migrations.upgrade(); ensure_seed_data()
+"""
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+resp = app.test_client().get("/auth/login")
+t3 = time.perf_counter()
+assert resp.status_code == 200, resp.status_code
+print(json.dumps({"import_s": t1 - t0, "create_app_s": t2 - t1, "first_request_s": t3 - t2,
+                  "pandas_loaded": "pandas" in sys.modules, "reportlab_loaded": "reportlab" in sys.modules}))
+"""
+
+def _run(code, tree, env):
+    out = subprocess.run([sys.executable, "-c", code], cwd=tree, env=env, check=True, capture_output=True, text=True)
+    return out.stdout.strip().splitlines()[-1] if out.stdout.strip() else ""
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--tree", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    help="checkout to measure (default: this one)")
+    args = ap.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="budget-startup-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}", PYTHONPATH=args.tree)
+    _run(PREPARE, args.tree, env)
+    samples = [json.loads(_run(PROBE, args.tree, env)) for _ in range(args.runs)]
+
+    def ms(key):
+        vals = [s[key] * 1000 for s in samples]
+        return {"median_ms": round(statistics.median(vals), 1), "min_ms": round(min(vals), 1), "max_ms": round(max(vals), 1)}
+    total = [sum(s[k] for k in ("import_s", "create_app_s", "first_request_s")) * 1000 for s in samples]
+    print(json.dumps({"tree": os.path.abspath(args.tree), "runs": args.runs,
+                      "import": ms("import_s"), "create_app": ms("create_app_s"), "first_request": ms("first_request_s"),
+                      "boot_to_first_response_median_ms": round(statistics.median(total), 1),
+                      "pandas_loaded": samples[-1]["pandas_loaded"], "reportlab_loaded": samples[-1]["reportlab_loaded"]},
+                     indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Diff two `benchmarks.run` baselines; exits 1 when any metric regresses past the threshold.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.2
+"""
+import argparse, json, sys
+
+METRICS = ["p50_ms", "p90_ms", "p99_ms", "sql_statements", "peak_memory_kb"]
+
+def compare(before, after, threshold):
+    """Rows of (endpoint, metric, before, after, ratio, regressed)."""
+    out = []
+    for name, new in sorted(after["endpoints"].items()):
+        old = before["endpoints"].get(name)
+        if not old: continue
+        for m in METRICS:
+            a, b = old.get(m), new.get(m)
+            if a is None or b is None: continue
+            ratio = b / a if a else (1.0 if b == a else float("inf"))
+            # SQL counts are exact, so any increase counts; timings and memory get the threshold
+            worse = b > a if m == "sql_statements" else ratio > 1 + threshold
+            out.append((name, m, a, b, ratio, worse))
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("before"); ap.add_argument("after")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown (default 0.2 = 20%%)")
+    args = ap.parse_args(argv)
+    with open(args.before) as f: before = json.load(f)
+    with open(args.after) as f: after = json.load(f)
+    if before["meta"]["txns"] != after["meta"]["txns"]:
+        print(f"warning: comparing runs with different sizes ({before['meta']['txns']} vs {after['meta']['txns']} txns)", file=sys.stderr)
+    rows = compare(before, after, args.threshold)
+    for name, m, a, b, ratio, worse in rows:
+        print(f"{name:26s} {m:15s} {a:12.2f} -> {b:12.2f}  {ratio:6.2f}x{'  REGRESSION' if worse else ''}")
+    sys.exit(1 if any(r[-1] for r in rows) else 0)
+
+if __name__ == "__main__":
+    main()
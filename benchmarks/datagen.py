@@ -0,0 +1,95 @@
+"""Deterministic synthetic data: users with multi-year transaction histories and budgets.
+
+The same seed, sizes and end date always produce the same rows. Inserts go
+through Core executemany in batches, and the tag links and monthly rollups are
+built at the end, so generating a million rows stays well within memory.
+"""
+import random
+from datetime import date, timedelta
+from sqlalchemy import func
+
+EXPENSE_CATEGORIES = [
+    "Groceries", "Rent", "Utilities", "Transport", "Dining", "Health", "Entertainment", "Misc",
+    "Coffee", "Fuel", "Parking", "Insurance", "Phone", "Internet", "Streaming", "Books", "Clothing",
+    "Gifts", "Travel", "Hotels", "Flights", "Pets", "Childcare", "Education", "Gym", "Pharmacy",
+    "Home Repair", "Furniture", "Electronics", "Charity", "Taxes", "Fees",
+]
+INCOME_CATEGORIES = ["Income", "Salary", "Bonus", "Interest", "Freelance"]
+TAGS = ["", "", "", "food", "travel", "work", "family", "weekly", "online", "cash"]
+BATCH = 10000
+
+def ensure_categories():
+    from app.models import db, Category
+    have = {(c.name, c.type): c.id for c in Category.query.all()}
+    for names, ctype in ((EXPENSE_CATEGORIES, "expense"), (INCOME_CATEGORIES, "income")):
+        for n in names:
+            if (n, ctype) not in have:
+                c = Category(name=n, type=ctype); db.session.add(c); db.session.flush(); have[(n, ctype)] = c.id
+    db.session.commit()
+    from app import category_cache
+    category_cache.invalidate()
+    return ([have[(n, "expense")] for n in EXPENSE_CATEGORIES], [have[(n, "income")] for n in INCOME_CATEGORIES])
+
+def months_back(end, years):
+    """YYYY-MM periods covering `years` years up to and including end's month, oldest first."""
+    y, m = end.year, end.month
+    out = []
+    for _ in range(12 * years):
+        out.append((y, m)); m -= 1
+        if m == 0: y, m = y - 1, 12
+    return out[::-1]
+
+def generate_user(email, txns, years=3, seed=0, end=None, password="bench"):
+    """Create one user with ~`txns` transactions over `years` years; returns the user id."""
+    from app.models import db, Budget, Transaction, User, dup_hash
+    from app import rollups, tag_index
+    end = end or date.today()
+    rnd = random.Random(f"{seed}:{email}")
+    expense_ids, income_ids = ensure_categories()
+    u = User(email=email); u.set_password(password); db.session.add(u); db.session.commit()
+    months = months_back(end, years)
+    start = date(*months[0], 1)
+    span = (end - start).days + 1
+    weights = [rnd.random() ** 2 for _ in expense_ids]
+
+    t = Transaction.__table__
+    before = db.session.query(func.max(Transaction.id)).scalar() or 0
+    rows = []
+    def flush():
+        for r in rows: r["dup_hash"] = dup_hash(u.id, r["date"], r["amount"], r["description"])
+        if rows: db.session.execute(t.insert(), rows); rows.clear()
+    for y, m in months:  # monthly salary
+        rows.append({"user_id": u.id, "category_id": income_ids[1], "date": date(y, m, 1), "amount": 75000 + rnd.randint(0, 5000),
+                     "description": f"Salary {y}-{m:02d}", "tags": "work", "is_deleted": False})
+    for i in range(max(0, txns - len(months))):
+        d = start + timedelta(days=rnd.randrange(span))
+        if rnd.random() < 0.03:
+            cid, amount = rnd.choice(income_ids), round(rnd.uniform(500, 20000), 2)
+        else:
+            cid, amount = rnd.choices(expense_ids, weights)[0], round(rnd.lognormvariate(6, 1.1), 2)
+        rows.append({"user_id": u.id, "category_id": cid, "date": d, "amount": amount,
+                     "description": f"Purchase {i} at store {rnd.randint(1, 500)}", "tags": rnd.choice(TAGS),
+                     "is_deleted": rnd.random() < 0.01})
+        if len(rows) >= BATCH: flush()
+    flush()
+    tag_index.index_new(u.id, before)  # link the tags strings, as an import does
+    budgets = [{"user_id": u.id, "category_id": cid, "period": f"{y}-{m:02d}", "target_amount": rnd.choice([2000, 5000, 10000, 20000])}
+               for y, m in months for cid in expense_ids[:8]]
+    db.session.execute(Budget.__table__.insert(), budgets)
+    db.session.commit()
+    rollups.rebuild(u.id)
+    return u.id
+
+def write_csv(path, rows, seed=0, end=None):
+    """An import file with `rows` unique rows in the importer's column layout."""
+    rnd = random.Random(seed)
+    end = end or date.today()
+    with open(path, "w") as f:
+        f.write("date,description,amount,type,category\n")
+        for i in range(rows):
+            d = end - timedelta(days=rnd.randrange(365))
+            if rnd.random() < 0.05:
+                f.write(f"{d.isoformat()},Import income {seed}-{i},{rnd.randint(1000, 9000)},income,Salary\n")
+            else:
+                f.write(f"{d.isoformat()},Import purchase {seed}-{i},{round(rnd.uniform(1, 3000), 2)},expense,{rnd.choice(EXPENSE_CATEGORIES)}\n")
+    return path
@@ -0,0 +1,135 @@
+"""Drive the hot endpoints through the Flask test client and record a JSON baseline.
+
+    python -m benchmarks.run --txns 10000 --iterations 20 --out bench/10k.json
+    python -m benchmarks.compare bench/10k-before.json bench/10k.json
+
+Each run builds a fresh SQLite database under a temp dir, generates one
+synthetic user with `datagen`, then for every endpoint records latency
+percentiles (the first, cold request is reported separately), SQL statements
+per request (from the X-SQL-Queries header) and peak traced Python memory
+during one extra request made with tracemalloc enabled. Endpoints that serve
+cached results (the summary.json LRU, stored Reports, the PDF cache) are also
+run as `<name>_uncached`, with every cache emptied before each request, so the
+compute paths are gated too.
+"""
+import argparse, io, json, os, platform, shutil, statistics, sys, tempfile, time, tracemalloc
+from datetime import date
+
+def percentile(values, p):
+    s = sorted(values)
+    k = (len(s) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+def endpoints(period, import_rows, seed):
+    from benchmarks import datagen
+    counter = {"n": 0}
+    def import_request():
+        counter["n"] += 1
+        path = datagen.write_csv(os.path.join(tempfile.gettempdir(), f"bench_import_{os.getpid()}.csv"),
+                                 import_rows, seed=seed * 1000 + counter["n"])
+        with open(path, "rb") as f: data = f.read()
+        os.remove(path)
+        return {"method": "post", "path": "/transactions/import",
+                "data": {"csvfile": (io.BytesIO(data), "bench.csv")}, "content_type": "multipart/form-data"}
+    cached = [
+        ("data_summary", lambda: {"path": "/data/summary.json"}),
+        ("data_forecast", lambda: {"path": "/data/forecast.json"}),
+        ("report_view", lambda: {"path": f"/reports/{period}"}),
+        ("report_pdf", lambda: {"path": f"/reports/{period}/export.pdf"}),
+    ]
+    # (name, request spec, whether to empty the payload LRU, stale Reports and PDF cache before each request)
+    return [
+        ("dashboard", lambda: {"path": "/"}, False),
+        *[(name, make, False) for name, make in cached],
+        ("transactions_list", lambda: {"path": "/transactions"}, False),
+        ("transactions_import", import_request, False),
+        ("transactions_export_csv", lambda: {"path": "/transactions/export.csv"}, False),
+        *[(name + "_uncached", make, True) for name, make in cached],
+    ]
+
+def reset_caches(app):
+    """Forget every cached result so the next request measures the compute path."""
+    from app import versions
+    from app.models import db, Report
+    versions._payloads.clear()
+    shutil.rmtree(os.path.join(app.instance_path, "pdf_cache"), ignore_errors=True)
+    with app.app_context():
+        Report.query.update({Report.is_stale: True}, synchronize_session=False); db.session.commit()
+
+def call(client, spec):
+    spec = dict(spec)
+    method = getattr(client, spec.pop("method", "get"))
+    t = time.perf_counter()
+    resp = method(spec.pop("path"), **spec)
+    body = resp.get_data()  # drain streamed responses
+    elapsed = (time.perf_counter() - t) * 1000
+    if resp.status_code >= 400: raise RuntimeError(f"{resp.status_code} from {resp.request.path}")
+    return elapsed, int(resp.headers.get("X-SQL-Queries", 0)), len(body)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--txns", type=int, default=10000, help="transactions for the benchmark user")
+    ap.add_argument("--years", type=int, default=3)
+    ap.add_argument("--iterations", type=int, default=10)
+    ap.add_argument("--import-rows", type=int, default=2000, help="rows per import request")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--end", default=None, help="last day of generated history, YYYY-MM-DD (default: today)")
+    ap.add_argument("--only", default=None, help="comma-separated endpoint names")
+    ap.add_argument("--out", default=None, help="write the JSON baseline here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="budget-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["SQL_QUERY_HEADER"] = "1"
+    from app import create_app, forecast, migrations
+    from benchmarks import datagen
+
+    end = date.fromisoformat(args.end) if args.end else date.today()
+    app = create_app()
+    app.config["TESTING"] = True
+    app.instance_path = tmp  # keep the PDF cache out of the real instance folder
+    t = time.perf_counter()
+    with app.app_context():
+        migrations.upgrade()
+        datagen.generate_user("bench@example.com", args.txns, years=args.years, seed=args.seed, end=end)
+        forecast.run_batch(600)  # as the nightly job would have
+    gen_seconds = time.perf_counter() - t
+
+    client = app.test_client()
+    client.post("/auth/login", data={"email": "bench@example.com", "password": "bench"})
+    period = f"{end.year}-{end.month:02d}"
+    only = set(args.only.split(",")) if args.only else None
+    results = {}
+    for name, make, uncached in endpoints(period, args.import_rows, args.seed):
+        if only and name not in only: continue
+        reset = (lambda: reset_caches(app)) if uncached else (lambda: None)
+        reset(); cold, sql, size = call(client, make())
+        lat, sqls = [], []
+        for _ in range(args.iterations):
+            reset(); ms, n, size = call(client, make()); lat.append(ms); sqls.append(n)
+        reset(); tracemalloc.start()
+        call(client, make())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {"cold_ms": round(cold, 2), "p50_ms": round(percentile(lat, 50), 2),
+                         "p90_ms": round(percentile(lat, 90), 2), "p99_ms": round(percentile(lat, 99), 2),
+                         "mean_ms": round(statistics.fmean(lat), 2), "max_ms": round(max(lat), 2),
+                         "sql_statements": max(sqls + [sql]), "peak_memory_kb": round(peak / 1024, 1),
+                         "response_bytes": size}
+        print(f"{name:26s} p50 {results[name]['p50_ms']:9.2f} ms  p99 {results[name]['p99_ms']:9.2f} ms  "
+              f"sql {results[name]['sql_statements']:4d}  peak {results[name]['peak_memory_kb']:10.1f} KiB", file=sys.stderr)
+
+    out = {"meta": {"txns": args.txns, "years": args.years, "iterations": args.iterations, "import_rows": args.import_rows,
+                    "seed": args.seed, "end": end.isoformat(), "generate_seconds": round(gen_seconds, 2),
+                    "python": platform.python_version(), "platform": platform.platform()},
+           "endpoints": results}
+    text = json.dumps(out, indent=2, sort_keys=True)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f: f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
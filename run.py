@@ -1,4 +1,7 @@
 from app import create_app
 app = create_app()
 if __name__ == "__main__":
+    with app.app_context():  # dev server only; deployments run `flask db upgrade` / `flask db seed`
+        from app import ensure_seed_data, migrations
+        migrations.upgrade(); ensure_seed_data()
     app.run(debug=True)
@@ -0,0 +1,33 @@
+import os, sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A fresh app on its own SQLite file, migrated and seeded, with the process-wide caches emptied."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("SQL_QUERY_HEADER", "1")
+    from app import create_app, ensure_seed_data, migrations, category_cache, versions
+    app = create_app()
+    app.config["TESTING"] = True
+    app.instance_path = str(tmp_path)
+    category_cache.invalidate(); versions._payloads.clear()
+    with app.app_context():
+        migrations.upgrade(); ensure_seed_data()
+    yield app
+    with app.app_context(): from app import db; db.engine.dispose()
+    category_cache.invalidate(); versions._payloads.clear()
+
+@pytest.fixture
+def client(app):
+    c = app.test_client()
+    c.post("/auth/login", data={"email": "admin@gmail.com", "password": "admin123"})
+    return c
+
+def import_csv(client, path):
+    with open(path, "rb") as f:
+        return client.post("/transactions/import", data={"csvfile": (f, os.path.basename(path))}, content_type="multipart/form-data")
+
+def sample(name): return os.path.join(ROOT, name)
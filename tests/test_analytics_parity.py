@@ -0,0 +1,185 @@
+"""The SQL analytics engine against the pandas implementation it replaced.
+
+`pandas_summary` and `pandas_report` are the old dashboard/summary.json and
+report_view computations, run over the same live transactions; every scenario
+compares them key by key with the new endpoints.
+"""
+import calendar
+from datetime import date
+import pandas as pd
+import pytest
+from conftest import import_csv, sample
+
+TODAY = date.today()
+PERIOD = TODAY.strftime("%Y-%m")
+
+def _frame(app, user_id):
+    from app.models import db, Category, Transaction
+    with app.app_context():
+        rows = db.session.query(Transaction.date, Transaction.amount, Category.type, Category.name)\
+            .join(Category, Transaction.category_id==Category.id)\
+            .filter(Transaction.user_id==user_id, Transaction.is_deleted==False).all()
+    return pd.DataFrame([{"date": d, "amount": float(a), "ctype": t, "category": n} for d, a, t, n in rows],
+                        columns=["date", "amount", "ctype", "category"])
+
+def _budgets(app, user_id, period):
+    from app.models import db, Budget, Category
+    with app.app_context():
+        return [(name, float(target)) for name, target in db.session.query(Category.name, Budget.target_amount)
+                .join(Category, Budget.category_id==Category.id).filter(Budget.user_id==user_id, Budget.period==period)]
+
+def pandas_summary(app, user_id):
+    df = _frame(app, user_id)
+    if df.empty:
+        return {"timeseries": [], "categories": [], "income_ts": [], "expense_ts": [],
+                "cm_categories": [], "daily_cum": [], "budget_total": 0, "spent_total": 0, "budget_progress": []}
+    df["date"] = pd.to_datetime(df["date"])
+    df["month"] = df["date"].dt.to_period("M").dt.to_timestamp()
+    inc = df[df["ctype"]=="income"].groupby("month")["amount"].sum().reset_index()
+    exp = df[df["ctype"]=="expense"].groupby("month")["amount"].sum().reset_index()
+    net = pd.merge(inc, exp, on="month", how="outer", suffixes=("_inc","_exp")).fillna(0)
+    net["net"] = net["amount_inc"] - net["amount_exp"]
+    net = net.sort_values("month")
+    cat_split = df[df["ctype"]=="expense"].groupby("category")["amount"].sum().reset_index()
+    cm_exp = df[(df["date"].dt.strftime("%Y-%m")==PERIOD) & (df["ctype"]=="expense")].copy()
+    cm_cat = cm_exp.groupby("category")["amount"].sum().reset_index()
+    budgets = _budgets(app, user_id, PERIOD)
+    budget_total = sum(t for _, t in budgets)
+    daily_cum = []
+    if not cm_exp.empty:
+        cm_exp["day"] = cm_exp["date"].dt.day
+        daily = cm_exp.groupby("day")["amount"].sum().sort_index().cumsum().reset_index()
+        dim = calendar.monthrange(TODAY.year, TODAY.month)[1]
+        daily_cum = [{"day": int(r["day"]), "spent_cum": round(float(r["amount"]), 2),
+                      "budget_line": round(budget_total/dim*int(r["day"]), 2)} for _, r in daily.iterrows()]
+    by_cat = cm_exp.groupby("category")["amount"].sum().to_dict()
+    progress = [{"category": n, "spent": round(by_cat.get(n, 0.0), 2), "budget": t,
+                 "pct": round(by_cat.get(n, 0.0) / t * 100.0 if t > 0 else 0.0, 1)} for n, t in budgets]
+    return {
+        "timeseries": [{"month": m.strftime("%Y-%m"), "net": round(v, 2)} for m, v in zip(net["month"], net["net"])],
+        "income_ts": [{"month": m.strftime("%Y-%m"), "income": round(v, 2)} for m, v in zip(inc["month"], inc["amount"])],
+        "expense_ts": [{"month": m.strftime("%Y-%m"), "expense": round(v, 2)} for m, v in zip(exp["month"], exp["amount"])],
+        "categories": [{"category": r["category"], "amount": round(r["amount"], 2)} for _, r in cat_split.iterrows()],
+        "cm_categories": [{"category": r["category"], "amount": round(r["amount"], 2)} for _, r in cm_cat.iterrows()],
+        "daily_cum": daily_cum, "budget_total": round(budget_total, 2), "spent_total": round(float(cm_exp["amount"].sum()), 2),
+        "budget_progress": progress,
+    }
+
+def pandas_report(app, user_id, period):
+    df = _frame(app, user_id)
+    df = df[pd.to_datetime(df["date"]).dt.strftime("%Y-%m")==period] if not df.empty else df
+    income = round(float(df[df["ctype"]=="income"]["amount"].sum()), 2)
+    expense = round(float(df[df["ctype"]=="expense"]["amount"].sum()), 2)
+    by_cat = df[df["ctype"]=="expense"].groupby("category")["amount"].sum().sort_values(ascending=False)
+    variance = [{"category": n, "spent": round(float(by_cat.get(n, 0.0)), 2), "budget": t,
+                 "delta": round(float(by_cat.get(n, 0.0)) - t, 2)} for n, t in _budgets(app, user_id, period)]
+    return {"income": income, "expense": expense, "balance": round(income - expense, 2),
+            "by_category": by_cat.round(2).to_dict(), "variance": variance}
+
+def _keyed(rows, key): return {r[key]: r for r in rows}
+
+def assert_summary_parity(new, old):
+    for k in ("timeseries", "income_ts", "expense_ts", "daily_cum"):
+        assert new[k] == [pytest.approx(r) for r in old[k]], k
+    for k in ("categories", "cm_categories"):  # ties between equal amounts may order either way
+        assert _keyed(new[k], "category") == {n: pytest.approx(r) for n, r in _keyed(old[k], "category").items()}, k
+        assert [r["amount"] for r in new[k]] == sorted((r["amount"] for r in new[k]), reverse=True), k
+    assert _keyed(new["budget_progress"], "category") == {n: pytest.approx(r) for n, r in _keyed(old["budget_progress"], "category").items()}
+    assert new["budget_total"] == pytest.approx(old["budget_total"])
+    assert new["spent_total"] == pytest.approx(old["spent_total"])
+
+def assert_report_parity(app, user_id, period):
+    from app import analytics
+    with app.app_context(): new = analytics.month_summary(user_id, period)
+    old = pandas_report(app, user_id, period)
+    for k in ("income", "expense", "balance"): assert new[k] == pytest.approx(old[k]), (period, k)
+    assert new["by_category"] == pytest.approx(old["by_category"]), period
+    assert _keyed(new["variance"], "category") == {n: pytest.approx(r) for n, r in _keyed(old["variance"], "category").items()}, period
+
+def check(app, client, user_id):
+    assert_summary_parity(client.get("/data/summary.json").get_json(), pandas_summary(app, user_id))
+    from app import analytics
+    df = _frame(app, user_id)
+    with app.app_context(): totals = analytics.type_totals(user_id)
+    for ctype in ("income", "expense"):
+        assert float(totals.get(ctype, 0)) == pytest.approx(float(df[df["ctype"]==ctype]["amount"].sum()), abs=0.005)
+    if not df.empty:
+        for period in sorted({d.strftime("%Y-%m") for d in df["date"]}) + [PERIOD]:
+            assert_report_parity(app, user_id, period)
+
+def _add(client, cid, amount, day=None, desc="x"):
+    client.post("/transactions/add", data={"date": (day or TODAY).isoformat(), "amount": amount, "category_id": cid,
+                                           "description": desc, "tags": ""})
+
+def _ids(app, user_id, **where):
+    from app.models import Transaction
+    with app.app_context():
+        return [t.id for t in Transaction.query.filter_by(user_id=user_id, is_deleted=False, **where)]
+
+def _cat(app, name):
+    from app.models import Category
+    with app.app_context(): return Category.query.filter_by(name=name).one().id
+
+@pytest.fixture
+def sample_user(app, client):
+    for name in ("transactions_sample.csv", "transactions_sample_large.csv"): import_csv(client, sample(name))
+    _add(client, _cat(app, "Groceries"), "1234.50")
+    _add(client, _cat(app, "Health"), "310.25", TODAY.replace(day=1))
+    _add(client, _cat(app, "Salary"), "5000", TODAY.replace(day=1))
+    client.post("/budgets", data={"category_id": _cat(app, "Groceries"), "period": PERIOD, "target_amount": "1300"})
+    client.post("/budgets", data={"category_id": _cat(app, "Health"), "period": PERIOD, "target_amount": "200"})
+    client.post("/budgets", data={"category_id": _cat(app, "Rent"), "period": "2025-09", "target_amount": "15000"})
+    return 1
+
+def test_sample_csvs(app, client, sample_user):
+    check(app, client, sample_user)
+
+def test_synthetic_history(app):
+    from benchmarks import datagen
+    with app.app_context(): uid = datagen.generate_user("parity@example.com", 5000, years=2, seed=7, end=TODAY)
+    client = app.test_client()
+    client.post("/auth/login", data={"email": "parity@example.com", "password": "bench"})
+    check(app, client, uid)
+
+def test_deleting_a_category_month(app, client, sample_user):
+    for tid in _ids(app, sample_user, category_id=_cat(app, "Health")):
+        client.get(f"/transactions/{tid}/delete")
+    body = client.get("/data/summary.json").get_json()
+    assert "Health" not in {r["category"] for r in body["categories"] + body["cm_categories"]}
+    check(app, client, sample_user)
+
+def test_deleting_everything(app, client, sample_user):
+    for tid in _ids(app, sample_user): client.get(f"/transactions/{tid}/delete")
+    body = client.get("/data/summary.json").get_json()
+    assert body["timeseries"] == [] and body["categories"] == [] and body["cm_categories"] == []
+    assert client.get("/reports").status_code == 200
+    check(app, client, sample_user)
+
+def test_edit_moves_totals(app, client, sample_user):
+    tid = _ids(app, sample_user, category_id=_cat(app, "Health"))[0]
+    client.post(f"/transactions/{tid}/edit", data={"date": "2025-10-15", "amount": "42", "category_id": _cat(app, "Dining"),
+                                                  "description": "moved", "tags": ""})
+    check(app, client, sample_user)
+
+def test_deleting_a_category_in_use(app, client, sample_user):
+    from app.models import db, Category
+    with app.app_context():
+        pets = Category(name="Pets", type="expense"); db.session.add(pets); db.session.commit(); pid = pets.id
+    _add(client, pid, "100")
+    r = client.get(f"/categories/{pid}/delete", follow_redirects=True)
+    assert b"Pets is used by 1 transactions or budgets" in r.data
+    with app.app_context(): assert db.session.get(Category, pid) is not None
+    check(app, client, sample_user)
+    assert b"Pets" in client.get("/transactions/export.csv").data
+    tid = _ids(app, sample_user, category_id=pid)[0]
+    client.get(f"/transactions/{tid}/delete")
+    client.get(f"/categories/{pid}/delete")  # soft-deleted rows still reference it
+    with app.app_context(): assert db.session.get(Category, pid) is not None
+    check(app, client, sample_user)
+
+def test_deleting_an_unused_category(app, client):
+    from app.models import db, Category
+    with app.app_context():
+        c = Category(name="Spare", type="expense"); db.session.add(c); db.session.commit(); cid = c.id
+    assert b"Category deleted." in client.get(f"/categories/{cid}/delete", follow_redirects=True).data
+    with app.app_context(): assert db.session.get(Category, cid) is None
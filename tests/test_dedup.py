@@ -0,0 +1,22 @@
+import re
+from conftest import import_csv, sample
+
+def _imported(resp): return re.findall(rb"CSV imported \((\d+) rows", resp.data)[-1]  # earlier flashes show too
+
+def test_reimport_skips_existing_rows(client):
+    import_csv(client, sample("transactions_sample.csv"))
+    r = client.post("/transactions/import", data={"csvfile": (open(sample("transactions_sample.csv"), "rb"), "again.csv")},
+                    content_type="multipart/form-data", follow_redirects=True)
+    assert _imported(r) == b"0"
+
+def test_upgrade_rehashes_old_keys(app, client):
+    from app import migrations
+    from app.models import db, SchemaVersion, Transaction
+    import_csv(client, sample("transactions_sample.csv"))
+    with app.app_context():  # as left by a version with the older hash format
+        Transaction.query.update({Transaction.dup_hash: "old"}); SchemaVersion.query.filter_by(version=7).delete()
+        db.session.commit()
+        assert [v for v, _ in migrations.upgrade()] == [7]
+    r = client.post("/transactions/import", data={"csvfile": (open(sample("transactions_sample.csv"), "rb"), "again.csv")},
+                    content_type="multipart/form-data", follow_redirects=True)
+    assert _imported(r) == b"0"
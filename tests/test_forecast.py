@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+from sqlalchemy import event
+from app.models import db, Forecast
+
+def _history(app):
+    from benchmarks import datagen
+    with app.app_context(): return datagen.generate_user("fc@example.com", 3000, years=1, end=date.today())
+
+def _login(app):
+    c = app.test_client()
+    c.post("/auth/login", data={"email": "fc@example.com", "password": "bench"})
+    return c
+
+def test_page_views_never_compute(app):
+    _history(app)
+    c = _login(app)
+    writes = []
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def _w(conn, cursor, statement, *args):
+            if statement.split()[0] in ("INSERT", "UPDATE", "DELETE"): writes.append(statement)
+        assert c.get("/").status_code == 200
+        body = c.get("/data/forecast.json").get_json()
+        event.remove(db.engine, "before_cursor_execute", _w)
+        assert Forecast.query.count() == 0
+    assert writes == []
+    assert body["available"] is False and body["projected_total"] is None
+    assert all(cat["projected"] == cat["spent"] for cat in body["categories"])
+
+def test_nightly_run_feeds_the_pages(app):
+    uid = _history(app)
+    c = _login(app)
+    assert c.get("/data/forecast.json").get_json()["available"] is False  # cached until the forecast exists
+    from app import forecast
+    with app.app_context():
+        assert forecast.run_batch(60) == (2, 0)  # this user and the seeded admin
+        assert forecast.run_batch(60) == (0, 0)  # already fresh today
+        stored = forecast.current(uid)
+    body = c.get("/data/forecast.json").get_json()
+    assert body["available"] is True and body["projected_total"] >= body["spent_total"]
+    with app.app_context():
+        assert forecast.current(uid, date.today() + timedelta(days=40)) is None  # next month: not computed yet
+    assert stored
@@ -0,0 +1,43 @@
+import io
+import pytest
+from app.models import Transaction
+
+HEADER = "date,description,amount,type,category\n"
+
+def _import(client, text):
+    return client.post("/transactions/import", data={"csvfile": (io.BytesIO(text.encode()), "t.csv")},
+                       content_type="multipart/form-data", follow_redirects=True)
+
+def _rows(app):
+    with app.app_context():
+        return sorted((t.date.isoformat(), t.description) for t in Transaction.query.filter_by(is_deleted=False))
+
+def test_mixed_date_formats(app, client):
+    r = _import(client, HEADER + "2025-09-01,a,10,expense,Rent\n09/15/2025,b,20.5,expense,Rent\n")
+    assert b"CSV imported (2 rows)" in r.data
+    assert _rows(app) == [("2025-09-01", "a"), ("2025-09-15", "b")]
+
+def test_bad_rows_are_reported(app, client):
+    r = _import(client, HEADER + "2025-09-01,a,10,expense,Rent\nsoon,b,20,expense,Rent\n2025-09-03,c,lots,expense,Rent\n")
+    assert r.status_code == 200 and b"Unreadable date or amount on line 3, 4." in r.data
+    assert _rows(app) == []
+
+def test_bad_row_in_a_later_chunk(app):
+    from app import importer
+    body = "".join(f"2025-08-{d:02d},r{d},{d},expense,Rent\n" for d in range(1, 6)) + "bad,x,1,expense,Rent\n"
+    with app.app_context(), pytest.raises(importer.ImportFormatError, match="line 7. Lines from 6 on were not imported; 4 rows"):
+        importer.import_csv(io.BytesIO((HEADER + body).encode()), 1, chunk_rows=2)
+    assert len(_rows(app)) == 4
+
+def test_abandoned_job_is_reported_failed(app, client, tmp_path):
+    from datetime import datetime, timedelta
+    from app.models import db, ImportJob
+    spool = tmp_path / "left.csv"; spool.write_text(HEADER)
+    with app.app_context():
+        old = datetime.utcnow() - timedelta(hours=1)
+        job = ImportJob(user_id=1, filename="t.csv", status="running", rows_done=4, worker="elsewhere:1",
+                        heartbeat_at=old, spool_path=str(spool))
+        db.session.add(job); db.session.commit(); job_id = job.id
+    data = client.get(f"/transactions/import/{job_id}").get_json()
+    assert data["status"] == "failed" and "after 4 rows" in data["error"] and data["finished_at"]
+    assert not spool.exists()
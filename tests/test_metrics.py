@@ -0,0 +1,32 @@
+import pytest
+
+@pytest.fixture
+def metrics_app(app):
+    app.config["METRICS_ENABLED"] = True
+    from app import instrumentation
+    instrumentation.init_app(app)
+    return app
+
+def _user(app):
+    from app.models import db, User
+    with app.app_context():
+        u = User(email="user@example.com"); u.set_password("pw"); db.session.add(u); db.session.commit()
+
+@pytest.mark.parametrize("path", ["/metrics", "/metrics/slow"])
+def test_admin_only_without_token(metrics_app, path):
+    _user(metrics_app)
+    c = metrics_app.test_client()
+    assert c.get(path).status_code == 403
+    c.post("/auth/login", data={"email": "user@example.com", "password": "pw"})
+    assert c.get(path).status_code == 403
+    c = metrics_app.test_client()
+    c.post("/auth/login", data={"email": "admin@gmail.com", "password": "admin123"})
+    assert c.get(path).status_code == 200
+
+@pytest.mark.parametrize("path", ["/metrics", "/metrics/slow"])
+def test_token(metrics_app, path):
+    metrics_app.config["METRICS_TOKEN"] = "s3cret"
+    c = metrics_app.test_client()
+    assert c.get(path).status_code == 403
+    assert c.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert c.get(path, headers={"Authorization": "Bearer s3cret"}).status_code == 200
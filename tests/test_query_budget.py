@@ -0,0 +1,39 @@
+"""The aggregation endpoints issue the same, bounded number of SQL statements whatever the row count."""
+from datetime import date
+import pytest
+
+MAX_STATEMENTS = 15
+END = date.today()
+
+def _counts(app, email):
+    c = app.test_client()
+    c.post("/auth/login", data={"email": email, "password": "bench"})
+    period = END.strftime("%Y-%m")
+    out = {}
+    for path in ["/", "/data/summary.json", "/transactions", "/transactions/export.csv", "/reports", f"/reports/{period}"]:
+        r = c.get(path)
+        assert r.status_code == 200, path
+        r.get_data()
+        out[path] = int(r.headers["X-SQL-Queries"])
+    return out
+
+@pytest.fixture
+def users(app):
+    from benchmarks import datagen
+    from app import category_cache
+    with app.app_context():
+        datagen.generate_user("small@example.com", 200, years=1, end=END)
+        datagen.generate_user("large@example.com", 4000, years=1, end=END)
+        category_cache.all()  # loaded once per process; keep that statement out of either user's counts
+    return app
+
+def test_statements_do_not_grow_with_rows(users):
+    small, large = _counts(users, "small@example.com"), _counts(users, "large@example.com")
+    assert small == large, (small, large)
+    assert max(large.values()) <= MAX_STATEMENTS, large
+
+def test_unknown_categories_reload_once_per_request(client):
+    items = [{"op": "create", "date": "2025-01-01", "amount": "1", "category_id": 1000 + i} for i in range(500)]
+    r = client.post("/api/transactions/batch", json={"items": items})
+    assert all(x["error"] == "unknown category_id" for x in r.get_json()["results"])
+    assert int(r.headers["X-SQL-Queries"]) <= 5
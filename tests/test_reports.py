@@ -0,0 +1,43 @@
+import pytest
+from app import analytics
+
+@pytest.mark.parametrize("period,months", [("2025-11", ["2025-11"]), ("2025-Q4", ["2025-10", "2025-11", "2025-12"]),
+                                           ("2025", [f"2025-{m:02d}" for m in range(1, 13)])])
+def test_period_months(period, months):
+    assert analytics.period_months(period) == months
+
+@pytest.mark.parametrize("period", ["0000", "0000-01", "2025-q1", "2025-13", "2025-+1", "2025-", "2025/11", "Nov 2025", "2025-Q5"])
+def test_bad_periods(client, period):
+    with pytest.raises(ValueError): analytics.period_months(period)
+    assert client.get(f"/reports/{period}").status_code == 404
+    assert client.get(f"/reports/{period}/export.pdf").status_code == 404
+
+@pytest.mark.parametrize("period", ["2025/11", "Nov 2025", "2025-Q1"])
+def test_budget_period_must_be_a_month(app, client, period):
+    from app.models import Budget
+    r = client.post("/budgets", data={"category_id": 4, "period": period, "target_amount": "100"}, follow_redirects=True)
+    assert r.status_code == 200 and b"Period must be a month" in r.data
+    with app.app_context(): assert Budget.query.count() == 0
+
+def test_legacy_budget_period_can_be_deleted(app, client):
+    from app.models import db, Budget
+    with app.app_context():
+        b = Budget(user_id=1, category_id=4, period="Nov 2025", target_amount=100); db.session.add(b); db.session.commit(); bid = b.id
+    assert client.get(f"/budgets/{bid}/delete").status_code == 302
+    with app.app_context(): assert Budget.query.count() == 0
+
+def test_pdf_cache_skips_rows_and_follows_edits(app, client, monkeypatch):
+    from conftest import import_csv, sample
+    from app import report_render
+    import_csv(client, sample("transactions_sample.csv"))
+    renders, loads = [], []
+    real_render, real_rows = report_render.render, analytics.transaction_rows
+    monkeypatch.setattr(report_render, "render", lambda *a: renders.append(a[0]) or real_render(*a))
+    monkeypatch.setattr(analytics, "transaction_rows", lambda *a: loads.append(a) or real_rows(*a))
+    first = client.get("/reports/2025-09/export.pdf").data
+    assert client.get("/reports/2025-09/export.pdf").data == first
+    assert len(renders) == 1 and len(loads) == 1  # the hit neither renders nor loads rows
+    client.post("/transactions/2/edit", data={"date": "2025-09-02", "amount": "800", "category_id": "7",
+                                              "description": "renamed", "tags": ""})  # same figures, new appendix text
+    client.get("/reports/2025-09/export.pdf")
+    assert len(renders) == 2
@@ -0,0 +1,40 @@
+from datetime import date
+
+def _batch(client, items, atomic=False):
+    return client.post("/api/transactions/batch", json={"items": items, "atomic": atomic})
+
+def _create(**kw): return dict({"op": "create", "date": date.today().isoformat(), "amount": "10", "category_id": 4}, **kw)
+
+def test_non_finite_amounts_are_item_errors(client):
+    r = _batch(client, [_create(amount="NaN"), _create(amount="Infinity"), _create(amount="-inf"), _create(amount="1e30"), _create()])
+    assert r.status_code == 200
+    res = r.get_json()["results"]
+    assert [x["status"] for x in res] == ["error"] * 4 + ["created"]
+    assert res[0]["error"] == "amount must be a finite number"
+
+def test_changes_feed_sees_batch_writes(client):
+    created = _batch(client, [_create(client_id="a"), _create(amount="20.5")]).get_json()["results"]
+    feed = client.get("/api/transactions/changes").get_json()
+    assert [i["id"] for i in feed["items"]] == [c["id"] for c in created]
+    tid = created[0]["id"]
+    _batch(client, [{"op": "update", "id": tid, "amount": "12"}, {"op": "delete", "id": created[1]["id"]}])
+    later = client.get(f"/api/transactions/changes?since={feed['cursor']}").get_json()["items"]
+    assert {i["id"] for i in later} == {tid, created[1]["id"]}
+    assert any(i.get("deleted") for i in later)
+
+def test_atomic_rollback(client):
+    r = _batch(client, [_create(), _create(amount="NaN")], atomic=True).get_json()
+    assert r["committed"] is False and [x["status"] for x in r["results"]] == ["skipped", "error"]
+    assert client.get("/api/transactions/changes").get_json()["items"] == []
+
+def test_amounts_beyond_the_column_are_item_errors(client):
+    res = _batch(client, [_create(amount="12345678901234.5"), _create(amount="-1e10"), _create(amount="9999999999.99")]).get_json()["results"]
+    assert [x["status"] for x in res] == ["error", "error", "created"]
+    assert res[0]["error"] == "amount is too large"
+
+def test_boolean_ids_are_not_row_ids(client):
+    tid = _batch(client, [_create()]).get_json()["results"][0]["id"]
+    assert tid == 1
+    res = _batch(client, [{"op": "update", "id": True, "amount": "99"}, {"op": "delete", "id": True}]).get_json()["results"]
+    assert [(x["status"], x["error"]) for x in res] == [("error", "not found")] * 2
+    assert client.get("/api/transactions/changes").get_json()["items"][0]["amount"] == 10.0
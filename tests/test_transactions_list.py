@@ -0,0 +1,6 @@
+def test_unknown_args_are_not_echoed(client):
+    r = client.get("/transactions?endpoint=x&_external=1&_anchor=a&_method=POST&q=rent&limit=5&cursor=2025-01-01_3")
+    assert r.status_code == 200
+    body = r.data.decode()
+    assert "endpoint=x" not in body and "_external" not in body and "_anchor" not in body and "#a" not in body
+    assert "/transactions/export.csv?q=rent&amp;limit=5" in body